@@ -19,11 +19,21 @@ st.set_page_config(
 )
 
 # Initialize data manager
-from data_manager import DataManager, render_data_management_sidebar, render_data_upload_tab, render_depot_comparison
+from data_manager import (
+    DataManager,
+    categorize_id_columns,
+    narrow_float_columns,
+    dataframe_fingerprint,
+    read_uploaded_file,
+    render_data_management_sidebar,
+    render_data_upload_tab,
+    render_depot_comparison
+)
 
 # Import UI components
 from components.ui_components import (
     load_custom_css,
+    load_deferred_css,
     render_page_header,
     render_kpi_card,
     render_empty_state,
@@ -42,18 +52,9 @@ def get_data_manager():
 
 data_manager = get_data_manager()
 
-# Load custom CSS theme
+# Load custom CSS theme (includes hiding the Streamlit menu and footer)
 load_custom_css()
 
-# Additional minimal inline styles for specific overrides
-st.markdown("""
-<style>
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-</style>
-""", unsafe_allow_html=True)
-
 
 # =============================================================================
 # HEADER
@@ -151,16 +152,41 @@ with st.sidebar:
 # Demo data removed - use real depot data or quick upload only
 
 
-@st.cache_data
-def load_uploaded_data(file):
-    """Load data from uploaded file"""
-    if file.name.endswith('.csv'):
-        df = pd.read_csv(file)
-    else:
-        df = pd.read_excel(file)
+@st.cache_data(show_spinner=False, max_entries=4, ttl=3600)
+def load_uploaded_data(file_id: str, file_name: str, _file_bytes: bytes) -> tuple:
+    """
+    Load data from an uploaded file and tag it with its detected depot.
+    
+    Cached on Streamlit's per-upload file_id, so reruns (tab switches, widget
+    changes) return the parsed frame without re-reading or even re-hashing
+    the file bytes. max_entries bounds how many parsed uploads stay in memory
+    and ttl drops the frames of files that were replaced or removed after an hour.
+    
+    Returns:
+        (DataFrame with a _depot_id column, detected depot ID or None)
+    """
+    df = read_uploaded_file(_file_bytes, file_name)
     
     df.columns = df.columns.str.lower().str.replace(' ', '_')
-    return df
+    if 'delivery_date_time' in df.columns:
+        df['delivery_date_time'] = pd.to_datetime(df['delivery_date_time'], errors='coerce')
+    
+    # Depot detection scans a full column; done once per file, not per rerun
+    detected_depot = detect_depot_from_data(df)
+    df['_depot_id'] = detected_depot or 'UPLOAD'
+    return narrow_float_columns(categorize_id_columns(df)), detected_depot
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_depot_data(depots: tuple, data_version: tuple) -> pd.DataFrame:
+    """
+    Load combined data for the selected depots.
+    
+    data_version (the depots' file modification times) is part of the cache
+    key, so an upload or delete invalidates the cached frame. max_entries keeps
+    those superseded versions and other depot selections from piling up.
+    """
+    return data_manager.get_all_data(list(depots))
 
 
 def detect_depot_from_data(df: pd.DataFrame) -> str:
@@ -170,18 +196,22 @@ def detect_depot_from_data(df: pd.DataFrame) -> str:
     
     for col in depot_columns:
         if col in df.columns:
-            # Get most common value
-            values = df[col].dropna().astype(str)
-            if len(values) > 0:
-                detected = values.mode().iloc[0] if len(values.mode()) > 0 else values.iloc[0]
-                return str(detected).upper()
+            # Most common value (smallest string on ties, as Series.mode). Runs on
+            # every rerun, so count the raw values and only stringify the distinct ones
+            counts = df[col].value_counts()
+            counts = counts[counts > 0]
+            if len(counts) > 0:
+                counts = counts.groupby(counts.index.astype(str)).sum()
+                return str(counts[counts == counts.max()].index.min()).upper()
     
     return None
 
 
 # Determine which data to use
 if data_source == "📦 Depot-Daten" and selected_depots:
-    df = data_manager.get_all_data(selected_depots)
+    data_version = data_manager.get_data_version(selected_depots)
+    df = load_depot_data(tuple(selected_depots), data_version)
+    data_source_key = ('depots', tuple(selected_depots), data_version)
     if df.empty:
         st.warning("⚠️ Keine Daten in den ausgewählten Depots. Laden Sie zuerst Daten hoch.")
         st.stop()
@@ -200,14 +230,11 @@ elif data_source == "📁 Schnell-Upload":
     )
     
     if uploaded_file:
-        df = load_uploaded_data(uploaded_file)
-        
-        # Auto-detect depot
-        detected_depot = detect_depot_from_data(df)
+        df, detected_depot = load_uploaded_data(uploaded_file.file_id, uploaded_file.name, uploaded_file.getvalue())
+        data_source_key = ('upload', uploaded_file.file_id)
         
         if detected_depot:
             st.sidebar.success(f"🔍 Depot erkannt: **{detected_depot}**")
-            df['_depot_id'] = detected_depot
             
             # Offer to save to depot
             if st.sidebar.checkbox(f"Zu Depot '{detected_depot}' hinzufügen", value=False):
@@ -217,7 +244,6 @@ elif data_source == "📁 Schnell-Upload":
                 st.sidebar.info(f"💾 {result['new_records']} neue Datensätze gespeichert")
         else:
             st.sidebar.info("ℹ️ Kein Depot erkannt (station/dsp Spalte fehlt)")
-            df['_depot_id'] = 'UPLOAD'
         
         st.sidebar.success(f"✅ {len(df):,} Datensätze geladen")
     else:
@@ -231,42 +257,224 @@ else:
 
 # Apply date filter
 if 'delivery_date_time' in df.columns:
-    df['delivery_date_time'] = pd.to_datetime(df['delivery_date_time'], errors='coerce')
+    # Both loaders already parse the column; only convert (and copy) if not
+    if not pd.api.types.is_datetime64_any_dtype(df['delivery_date_time']):
+        df['delivery_date_time'] = pd.to_datetime(df['delivery_date_time'], errors='coerce')
     if date_range and len(date_range) == 2:
         df = df[(df['delivery_date_time'].dt.date >= date_range[0]) & 
                 (df['delivery_date_time'].dt.date <= date_range[1])]
 
+# The analysis tabs need rows; with none left after filtering they show one
+# empty state instead of running feature engineering and empty charts
+has_rows = not df.empty
+
 
 # =============================================================================
 # FEATURE ENGINEERING (cached)
 # =============================================================================
 
-@st.cache_data
-def compute_features(data):
+# The filtered frame is hashed once per data selection; cached functions below
+# take it as an underscore argument (not hashed by Streamlit) and key on this
+# fingerprint. The source (depots and their file versions, or the upload) plus
+# the date range fully determine the frame, so reruns that only change other
+# widgets reuse the session's stored fingerprint instead of rehashing.
+data_label = (data_source_key, tuple(date_range) if date_range else ())
+if st.session_state.get('_data_label') != data_label:
+    st.session_state['_data_fingerprint'] = dataframe_fingerprint(df)
+    st.session_state['_data_label'] = data_label
+data_fingerprint = st.session_state['_data_fingerprint']
+
+
+@st.cache_data(show_spinner=False)
+def compute_features(_data, fingerprint: str):
     """Compute ML features for all drivers"""
     from ml_engine.feature_engineering import FeatureEngineer
     fe = FeatureEngineer()
-    return fe.transform(data)
+    return fe.transform(_data)
+
+
+@st.cache_data(show_spinner=False)
+def train_risk_model(_features, fingerprint: str, depots: tuple):
+    """Train the risk model for one depot selection of the current data"""
+    from components.risk_dashboard import train_model_on_data
+    return train_model_on_data(_features)
+
+
+@st.cache_data(show_spinner=False)
+def analyze_abuse(_data, fingerprint: str, depots: tuple):
+    """Run customer abuse detection for one depot selection of the current data"""
+    from ml_engine.customer_abuse_detection import CustomerAbuseDetector
+    return CustomerAbuseDetector().analyze(_data)
+
+
+@st.cache_data(show_spinner=False)
+def compute_weekly_depot_trend(_data, fingerprint: str) -> pd.DataFrame:
+    """Weekly deliveries (and concessions/rate) per depot, one row per depot-week"""
+    # Factorize depot and an integer year * 100 + ISO week key once and count
+    # every depot-week cell with np.bincount over the combined codes, instead
+    # of a groupby building a MultiIndex; week labels are formatted only for
+    # the resulting rows, not for every delivery
+    dates = _data['delivery_date_time']
+    week_key = dates.dt.year * 100 + dates.dt.isocalendar().week
+    depot_codes, depots = pd.factorize(_data['_depot_id'], sort=True)
+    week_codes, weeks = pd.factorize(week_key, sort=True)
+    
+    # Rows without a depot or a date belong to no cell
+    valid = (depot_codes >= 0) & (week_codes >= 0)
+    cells = depot_codes[valid] * len(weeks) + week_codes[valid]
+    n_cells = len(depots) * len(weeks)
+    rows = np.bincount(cells, minlength=n_cells)
+    observed = np.flatnonzero(rows)
+    
+    weekly = pd.DataFrame({
+        'Depot': depots.take(observed // len(weeks)) if len(weeks) else depots[:0],
+        'Week': weeks.take(observed % len(weeks)) if len(weeks) else weeks[:0]
+    })
+    if 'concession_type' in _data.columns:
+        concessions = _data['concession_type'].notna().to_numpy()[valid]
+        deliveries = _data['transporter_id'].notna().to_numpy()[valid]
+        weekly['Concessions'] = np.bincount(cells, weights=concessions, minlength=n_cells)[observed].astype('int64')
+        weekly['Deliveries'] = np.bincount(cells, weights=deliveries, minlength=n_cells)[observed].astype('int64')
+        weekly['Rate'] = weekly['Concessions'] / weekly['Deliveries'] * 100
+    else:
+        weekly['Deliveries'] = rows[observed]
+    
+    week_key = weekly['Week'].astype('int64')
+    weekly['Week'] = (week_key // 100).astype(str) + '-W' + (week_key % 100).astype(str).str.zfill(2)
+    return weekly
 
 
 # Compute features
-with st.spinner("Computing driver features..."):
-    try:
-        features_df = compute_features(df)
-        # Add depot info to features
-        if '_depot_id' in df.columns:
-            driver_depot = df.groupby('transporter_id')['_depot_id'].first()
-            features_df['_depot_id'] = features_df.index.map(driver_depot)
-    except Exception as e:
-        st.error(f"Error computing features: {e}")
-        features_df = pd.DataFrame()
+features_df = pd.DataFrame()
+if has_rows:
+    with st.spinner("Computing driver features..."):
+        try:
+            features_df = compute_features(df, data_fingerprint)
+            # Add depot info to features
+            if '_depot_id' in df.columns:
+                driver_depot = df.groupby('transporter_id', observed=True)['_depot_id'].first()
+                features_df['_depot_id'] = features_df.index.map(driver_depot)
+        except Exception as e:
+            st.error(f"Error computing features: {e}")
+            features_df = pd.DataFrame()
+
+
+# Values shared by several tabs are derived once per rerun instead of per tab
+has_depot_col = '_depot_id' in df.columns
+depot_ids = df['_depot_id'].unique().tolist() if has_depot_col else []
+feature_depot_ids = (
+    features_df['_depot_id'].unique().tolist() if '_depot_id' in features_df.columns else []
+)
+
+
+# =============================================================================
+# CHART BUILDERS (cached)
+# =============================================================================
+
+# Figures are keyed on the small aggregated frames, so reruns that don't change
+# the underlying data reuse the built figure instead of reconstructing it.
+
+# Weeks shown by default on the weekly trend, and most labelled ticks on its axis
+WEEKLY_TREND_WINDOW = 26
+WEEKLY_TREND_MAX_TICKS = 12
+
+
+@st.cache_data(show_spinner=False)
+def build_depot_bar_figure(depot_stats: pd.DataFrame, y_col: str, title: str, y_title: str):
+    """Bar chart of one metric per depot, labelled with depot_stats['Label']"""
+    # A single graph_objects trace with one color per bar, instead of Plotly
+    # Express building a trace per depot. The value labels show on hover rather
+    # than as text placed (and fitted) outside every bar.
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+    palette = qualitative.Plotly
+    fig = go.Figure(go.Bar(
+        x=depot_stats['Depot'].to_numpy(),
+        y=depot_stats[y_col].to_numpy(),
+        text=depot_stats['Label'].to_numpy(),
+        textposition='none',
+        marker_color=[palette[i % len(palette)] for i in range(len(depot_stats))],
+        hovertemplate='%{x}: %{text}<extra></extra>'
+    ))
+    fig.update_layout(title=title, showlegend=False, xaxis_title='Depot', yaxis_title=y_title)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def build_weekly_trend_figure(weekly: pd.DataFrame, y_col: str, y_title: str):
+    """Weekly line chart with one trace per depot"""
+    import plotly.express as px
+    fig = px.line(
+        weekly,
+        x='Week',
+        y=y_col,
+        color='Depot',
+        # Per-point markers only while the window is short enough to read them
+        markers=weekly['Week'].nunique() <= WEEKLY_TREND_WINDOW,
+        title=f"Weekly {y_title} Trend"
+    )
+    # Week labels sort chronologically as strings; pin that order across depots
+    # and label at most WEEKLY_TREND_MAX_TICKS of them instead of every week on the axis
+    weeks = np.sort(weekly['Week'].unique())
+    fig.update_layout(
+        xaxis_title="Week",
+        yaxis_title=y_title,
+        xaxis=dict(
+            categoryorder='array',
+            categoryarray=weeks,
+            tickmode='array',
+            tickvals=weeks[::max(1, int(np.ceil(len(weeks) / WEEKLY_TREND_MAX_TICKS)))]
+        )
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def build_depot_rate_box_figure(driver_rates: pd.DataFrame):
+    """Box plot of driver 30-day concession rates per depot"""
+    import plotly.express as px
+    fig = px.box(
+        driver_rates,
+        x='_depot_id',
+        y='concession_rate_30d',
+        color='_depot_id',
+        title="Driver Concession Rate Distribution by Depot",
+        labels={'_depot_id': 'Depot', 'concession_rate_30d': '30-Day Concession Rate'}
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+@st.fragment
+def render_weekly_depot_trend(weekly: pd.DataFrame, has_concession_col: bool):
+    """Weekly trend chart with its history toggle"""
+    if has_concession_col:
+        y_col = 'Rate'
+        y_title = "Concession Rate (%)"
+    else:
+        y_col = 'Deliveries'
+        y_title = "Deliveries"
+    
+    # Plot the most recent weeks unless the full history is asked for
+    weeks = np.sort(weekly['Week'].unique())
+    if len(weeks) > WEEKLY_TREND_WINDOW:
+        show_all = st.toggle(
+            f"Show full history ({len(weeks)} weeks)",
+            value=False,
+            key="weekly_trend_full_history"
+        )
+        if not show_all:
+            weekly = weekly[weekly['Week'].isin(weeks[-WEEKLY_TREND_WINDOW:])]
+    
+    fig = build_weekly_trend_figure(weekly, y_col, y_title)
+    st.plotly_chart(fig, use_container_width=True)
 
 
 # =============================================================================
 # MAIN TABS
 # =============================================================================
 
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+TAB_LABELS = [
     "📊 Überblick",
     "🏭 Depot-Vergleich",
     "🎯 Risikoanalyse",
@@ -274,178 +482,43 @@ tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "🚨 Missbrauchserkennung",
     "👤 Fahrerprofile",
     "📤 Datenverwaltung"
-])
+]
+
+# st.tabs executes every tab body on each rerun; a keyed radio lets us run only the
+# visible tab. The selection lives in st.session_state.active_tab across reruns.
+active_tab = st.radio(
+    "Ansicht",
+    TAB_LABELS,
+    horizontal=True,
+    key="active_tab",
+    label_visibility="collapsed"
+)
+
+# Only the data management tab works without rows in the selected date range
+if not has_rows and active_tab != TAB_LABELS[6]:
+    render_empty_state(
+        icon="🔍",
+        title="Keine Daten im gewählten Zeitraum",
+        description="Passen Sie den Datumsfilter in der Seitenleiste an."
+    )
 
 
 # =============================================================================
 # TAB 1: OVERVIEW
 # =============================================================================
 
-with tab1:
-    st.header("📊 Executive Overview")
-    
-    # Helper function for safe column access
-    def safe_col_sum(dataframe, col, condition_func=None):
-        """Safely sum a column, return 0 if column doesn't exist"""
-        if col not in dataframe.columns:
-            return 0
-        if condition_func:
-            return condition_func(dataframe[col]).sum()
-        return dataframe[col].sum()
-    
-    def has_concession_type(dataframe):
-        """Check if concession_type column exists and has data"""
-        return 'concession_type' in dataframe.columns
-    
-    # Show depot badges if multi-depot
-    if '_depot_id' in df.columns:
-        depot_ids = df['_depot_id'].unique()
-        if len(depot_ids) > 1:
-            st.markdown("**Active Depots:** " + " ".join([f"📦 {d}" for d in depot_ids]))
-    
-    # Key metrics row
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    total_deliveries = len(df)
-    total_drivers = df['transporter_id'].nunique() if 'transporter_id' in df.columns else 0
-    total_concessions = df['concession_type'].notna().sum() if has_concession_type(df) else 0
-    concession_rate = total_concessions / total_deliveries * 100 if total_deliveries > 0 else 0
-    
-    # Calculate trend
-    rate_delta = 0
-    if has_concession_type(df) and 'delivery_date_time' in df.columns:
-        df_sorted = df.sort_values('delivery_date_time')
-        if len(df_sorted) > 100:
-            recent = df_sorted.tail(len(df_sorted)//2)
-            previous = df_sorted.head(len(df_sorted)//2)
-            recent_rate = recent['concession_type'].notna().sum() / len(recent) * 100
-            prev_rate = previous['concession_type'].notna().sum() / len(previous) * 100
-            rate_delta = recent_rate - prev_rate
-    
-    col1.metric("Total Deliveries", f"{total_deliveries:,}")
-    col2.metric("Active Drivers", total_drivers)
-    col3.metric("Total Concessions", total_concessions)
-    col4.metric("Concession Rate", f"{concession_rate:.2f}%", 
-                delta=f"{rate_delta:+.2f}%" if rate_delta != 0 else None, delta_color="inverse")
-    
-    if 'concession_cost' in df.columns:
-        total_cost = df['concession_cost'].sum()
-        col5.metric("Cost Impact", f"€{total_cost:,.0f}")
-    else:
-        col5.metric("Records", f"{total_deliveries:,}")
-    
-    st.divider()
-    
-    # Charts row
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("📈 Daily Trend")
-        
-        if 'delivery_date_time' in df.columns:
-            df['date'] = df['delivery_date_time'].dt.date
-            
-            if has_concession_type(df):
-                daily = df.groupby('date').agg({
-                    'concession_type': lambda x: x.notna().sum(),
-                    'transporter_id': 'count'
-                }).reset_index()
-                daily.columns = ['date', 'concessions', 'total']
-                daily['rate'] = daily['concessions'] / daily['total'] * 100
-            else:
-                # Just show delivery counts if no concession data
-                daily = df.groupby('date').size().reset_index(name='total')
-                daily['rate'] = 0
-                daily['concessions'] = 0
-            
-            daily['date'] = pd.to_datetime(daily['date'])
-            
-            import plotly.graph_objects as go
-            fig = go.Figure()
-            
-            if has_concession_type(df):
-                fig.add_trace(go.Scatter(
-                    x=daily['date'], y=daily['rate'],
-                    mode='lines+markers',
-                    name='Concession Rate',
-                    line=dict(color='#1a237e', width=2)
-                ))
-                fig.update_layout(
-                    xaxis_title="Date",
-                    yaxis_title="Concession Rate (%)",
-                    height=300
-                )
-            else:
-                fig.add_trace(go.Bar(
-                    x=daily['date'], y=daily['total'],
-                    name='Deliveries',
-                    marker_color='#1a237e'
-                ))
-                fig.update_layout(
-                    xaxis_title="Date",
-                    yaxis_title="Deliveries",
-                    height=300
-                )
-            
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("No delivery_date_time column found")
-    
-    with col2:
-        st.subheader("🍩 Concession Type Distribution")
-        
-        if has_concession_type(df):
-            type_counts = df[df['concession_type'].notna()]['concession_type'].value_counts()
-            
-            import plotly.express as px
-            if len(type_counts) > 0:
-                fig = px.pie(
-                    values=type_counts.values,
-                    names=type_counts.index,
-                    hole=0.4
-                )
-                fig.update_layout(height=300)
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("No concessions in selected period")
-        else:
-            st.info("Concession type column not available in data")
-    
-    st.divider()
-    
-    # Top/Bottom drivers
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("🏆 Top Performers")
-        if len(features_df) > 0:
-            top_drivers = features_df.nsmallest(5, 'concession_rate_30d')[['concession_rate_30d']]
-            if '_depot_id' in features_df.columns:
-                top_drivers['depot'] = features_df.loc[top_drivers.index, '_depot_id']
-            top_drivers['rate'] = (top_drivers['concession_rate_30d'] * 100).round(2).astype(str) + '%'
-            display_cols = ['depot', 'rate'] if 'depot' in top_drivers.columns else ['rate']
-            st.dataframe(top_drivers[display_cols], use_container_width=True)
-    
-    with col2:
-        st.subheader("⚠️ Need Attention")
-        if len(features_df) > 0:
-            bottom_drivers = features_df.nlargest(5, 'concession_rate_30d')[['concession_rate_30d', 'rate_trend_7d']]
-            if '_depot_id' in features_df.columns:
-                bottom_drivers['depot'] = features_df.loc[bottom_drivers.index, '_depot_id']
-            bottom_drivers['rate'] = (bottom_drivers['concession_rate_30d'] * 100).round(2).astype(str) + '%'
-            bottom_drivers['trend'] = bottom_drivers['rate_trend_7d'].apply(lambda x: '📈' if x > 0 else '📉')
-            display_cols = ['depot', 'rate', 'trend'] if 'depot' in bottom_drivers.columns else ['rate', 'trend']
-            st.dataframe(bottom_drivers[display_cols], use_container_width=True)
+if has_rows and active_tab == TAB_LABELS[0]:
+    render_overview_tab(df, features_df, (data_fingerprint,))
 
 
 # =============================================================================
 # TAB 2: DEPOT COMPARISON
 # =============================================================================
 
-with tab2:
+if has_rows and active_tab == TAB_LABELS[1]:
     st.header("🏭 Depot Comparison")
     
-    if '_depot_id' not in df.columns or df['_depot_id'].nunique() < 2:
+    if not has_depot_col or len(depot_ids) < 2:
         st.info("📊 Depot comparison requires data from at least 2 depots. Upload data to multiple depots to see comparisons.")
         
         # Show how to add depots
@@ -456,23 +529,31 @@ with tab2:
         3. **Return here** to compare performance across depots
         """)
     else:
-        # Depot summary cards
-        depot_ids = df['_depot_id'].unique()
+        # Per-depot counts from one groupby pass, shared by the cards and the
+        # bar chart instead of masking the full frame once per depot
         has_concession_col = 'concession_type' in df.columns
+        by_depot = df.groupby('_depot_id', observed=True)
+        depot_rows = by_depot.size()
+        depot_driver_counts = by_depot['transporter_id'].nunique() if 'transporter_id' in df.columns else None
+        depot_concessions = (
+            df['concession_type'].notna().groupby(df['_depot_id'], observed=True).sum()
+            if has_concession_col else None
+        )
         
+        # Depot summary cards
         cols = st.columns(len(depot_ids))
         for i, depot_id in enumerate(depot_ids):
-            depot_df = df[df['_depot_id'] == depot_id]
-            depot_rate = depot_df['concession_type'].notna().sum() / len(depot_df) * 100 if has_concession_col else 0
-            depot_drivers = depot_df['transporter_id'].nunique() if 'transporter_id' in depot_df.columns else 0
+            depot_len = depot_rows[depot_id]
+            depot_rate = depot_concessions[depot_id] / depot_len * 100 if has_concession_col else 0
+            depot_drivers = depot_driver_counts[depot_id] if depot_driver_counts is not None else 0
             
             with cols[i]:
                 st.metric(
                     f"📦 {depot_id}",
-                    f"{depot_rate:.2f}%" if has_concession_col else f"{len(depot_df):,}",
-                    help=f"Deliveries: {len(depot_df):,} | Drivers: {depot_drivers}"
+                    f"{depot_rate:.2f}%" if has_concession_col else f"{depot_len:,}",
+                    help=f"Deliveries: {depot_len:,} | Drivers: {depot_drivers}"
                 )
-                st.caption(f"{depot_drivers} drivers | {len(depot_df):,} deliveries")
+                st.caption(f"{depot_drivers} drivers | {depot_len:,} deliveries")
         
         st.divider()
         
@@ -480,40 +561,26 @@ with tab2:
         if has_concession_col:
             st.subheader("📊 Concession Rate Comparison")
             
-            depot_stats = df.groupby('_depot_id').agg({
-                'transporter_id': 'nunique',
-                'concession_type': lambda x: x.notna().sum(),
-                'delivery_date_time': 'count'
-            }).reset_index()
-            depot_stats.columns = ['Depot', 'Drivers', 'Concessions', 'Deliveries']
+            depot_stats = pd.DataFrame({
+                'Drivers': depot_driver_counts,
+                'Concessions': depot_concessions,
+                'Deliveries': by_depot['delivery_date_time'].count()
+            }).rename_axis('Depot').reset_index()
             depot_stats['Rate'] = depot_stats['Concessions'] / depot_stats['Deliveries'] * 100
+            depot_stats['Label'] = depot_stats['Rate'].round(2).astype(str) + '%'
             
-            fig = px.bar(
-                depot_stats,
-                x='Depot',
-                y='Rate',
-                color='Depot',
-                text=depot_stats['Rate'].round(2).astype(str) + '%',
-                title="Concession Rate by Depot"
+            fig = build_depot_bar_figure(
+                depot_stats, 'Rate', "Concession Rate by Depot", "Concession Rate (%)"
             )
-            fig.update_traces(textposition='outside')
-            fig.update_layout(showlegend=False, yaxis_title="Concession Rate (%)")
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.subheader("📊 Delivery Volume Comparison")
-            depot_stats = df.groupby('_depot_id').size().reset_index(name='Deliveries')
-            depot_stats.columns = ['Depot', 'Deliveries']
+            depot_stats = depot_rows.rename_axis('Depot').reset_index(name='Deliveries')
+            depot_stats['Label'] = depot_stats['Deliveries']
             
-            fig = px.bar(
-                depot_stats,
-                x='Depot',
-                y='Deliveries',
-                color='Depot',
-                text='Deliveries',
-                title="Deliveries by Depot"
+            fig = build_depot_bar_figure(
+                depot_stats, 'Deliveries', "Deliveries by Depot", "Deliveries"
             )
-            fig.update_traces(textposition='outside')
-            fig.update_layout(showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
         
         st.divider()
@@ -522,50 +589,16 @@ with tab2:
         st.subheader("📈 Weekly Trend by Depot")
         
         if 'delivery_date_time' in df.columns:
-            df['week'] = df['delivery_date_time'].dt.isocalendar().week
-            df['year'] = df['delivery_date_time'].dt.year
-            df['year_week'] = df['year'].astype(str) + '-W' + df['week'].astype(str).str.zfill(2)
-            
-            if has_concession_col:
-                weekly = df.groupby(['_depot_id', 'year_week']).agg({
-                    'concession_type': lambda x: x.notna().sum(),
-                    'transporter_id': 'count'
-                }).reset_index()
-                weekly.columns = ['Depot', 'Week', 'Concessions', 'Deliveries']
-                weekly['Rate'] = weekly['Concessions'] / weekly['Deliveries'] * 100
-                y_col = 'Rate'
-                y_title = "Concession Rate (%)"
-            else:
-                weekly = df.groupby(['_depot_id', 'year_week']).size().reset_index(name='Deliveries')
-                weekly.columns = ['Depot', 'Week', 'Deliveries']
-                y_col = 'Deliveries'
-                y_title = "Deliveries"
-            
-            fig = px.line(
-                weekly,
-                x='Week',
-                y=y_col,
-                color='Depot',
-                markers=True,
-                title=f"Weekly {y_title} Trend"
-            )
-            fig.update_layout(xaxis_title="Week", yaxis_title=y_title)
-            st.plotly_chart(fig, use_container_width=True)
+            render_weekly_depot_trend(compute_weekly_depot_trend(df, data_fingerprint), has_concession_col)
         
         # Driver distribution by depot
         st.divider()
         st.subheader("👥 Driver Performance by Depot")
         
         if len(features_df) > 0 and '_depot_id' in features_df.columns and 'concession_rate_30d' in features_df.columns:
-            fig = px.box(
-                features_df.reset_index(),
-                x='_depot_id',
-                y='concession_rate_30d',
-                color='_depot_id',
-                title="Driver Concession Rate Distribution by Depot",
-                labels={'_depot_id': 'Depot', 'concession_rate_30d': '30-Day Concession Rate'}
+            fig = build_depot_rate_box_figure(
+                features_df[['_depot_id', 'concession_rate_30d']].reset_index(drop=True)
             )
-            fig.update_layout(showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Driver performance data not available")
@@ -575,24 +608,27 @@ with tab2:
 # TAB 3: RISK ANALYSIS
 # =============================================================================
 
-with tab3:
+if has_rows and active_tab == TAB_LABELS[2]:
     if len(features_df) > 0:
         # Depot filter for risk analysis
         if '_depot_id' in features_df.columns:
             depot_filter = st.multiselect(
                 "Filter by Depot",
-                options=features_df['_depot_id'].unique(),
-                default=features_df['_depot_id'].unique(),
+                options=feature_depot_ids,
+                default=feature_depot_ids,
                 key="risk_depot_filter"
             )
             filtered_features = features_df[features_df['_depot_id'].isin(depot_filter)]
-            filtered_df = df[df['_depot_id'].isin(depot_filter)] if '_depot_id' in df.columns else df
+            filtered_df = df[df['_depot_id'].isin(depot_filter)] if has_depot_col else df
         else:
+            depot_filter = []
             filtered_features = features_df
             filtered_df = df
         
         from components.risk_dashboard import render_risk_dashboard
-        render_risk_dashboard(filtered_df, features_df=filtered_features)
+        with st.spinner("Training risk model..."):
+            risk_model = train_risk_model(filtered_features, data_fingerprint, tuple(depot_filter))
+        render_risk_dashboard(filtered_df, model=risk_model, features_df=filtered_features)
     else:
         st.warning("Unable to compute features. Please check your data.")
 
@@ -601,24 +637,25 @@ with tab3:
 # TAB 4: PATTERN RECOGNITION
 # =============================================================================
 
-with tab4:
+if has_rows and active_tab == TAB_LABELS[3]:
     if len(features_df) > 0:
         # Depot filter for pattern analysis
         if '_depot_id' in features_df.columns:
             depot_filter = st.multiselect(
                 "Filter by Depot",
-                options=features_df['_depot_id'].unique(),
-                default=features_df['_depot_id'].unique(),
+                options=feature_depot_ids,
+                default=feature_depot_ids,
                 key="pattern_depot_filter"
             )
             filtered_features = features_df[features_df['_depot_id'].isin(depot_filter)]
-            filtered_df = df[df['_depot_id'].isin(depot_filter)] if '_depot_id' in df.columns else df
+            filtered_df = df[df['_depot_id'].isin(depot_filter)] if has_depot_col else df
         else:
+            depot_filter = []
             filtered_features = features_df
             filtered_df = df
         
         from components.pattern_analysis_tab import render_pattern_analysis
-        render_pattern_analysis(filtered_df, filtered_features)
+        render_pattern_analysis(filtered_df, filtered_features, (data_fingerprint, tuple(depot_filter)))
     else:
         st.warning("Unable to compute features. Please check your data.")
 
@@ -627,153 +664,39 @@ with tab4:
 # TAB 5: CUSTOMER ABUSE DETECTION
 # =============================================================================
 
-with tab5:
+if has_rows and active_tab == TAB_LABELS[4]:
     # Depot filter for abuse detection
-    if '_depot_id' in df.columns:
+    if has_depot_col:
         depot_filter = st.multiselect(
             "Filter by Depot",
-            options=df['_depot_id'].unique(),
-            default=df['_depot_id'].unique(),
+            options=depot_ids,
+            default=depot_ids,
             key="abuse_depot_filter"
         )
         filtered_df = df[df['_depot_id'].isin(depot_filter)]
     else:
+        depot_filter = []
         filtered_df = df
     
     from ml_engine.customer_abuse_detection import render_abuse_detection_tab
-    render_abuse_detection_tab(filtered_df)
+    with st.spinner("Analysiere Muster..."):
+        abuse_results = analyze_abuse(filtered_df, data_fingerprint, tuple(depot_filter))
+    render_abuse_detection_tab(filtered_df, results=abuse_results)
 
 
 # =============================================================================
 # TAB 6: DRIVER PROFILES
 # =============================================================================
 
-with tab6:
-    st.header("👤 Driver Profiles")
-    
-    # Depot filter
-    if '_depot_id' in df.columns:
-        col1, col2 = st.columns([1, 2])
-        with col1:
-            depot_filter = st.selectbox(
-                "Filter by Depot",
-                options=['All'] + list(df['_depot_id'].unique()),
-                key="driver_depot_filter"
-            )
-        
-        if depot_filter != 'All':
-            driver_df_filtered = df[df['_depot_id'] == depot_filter]
-        else:
-            driver_df_filtered = df
-    else:
-        driver_df_filtered = df
-    
-    # Check if transporter_id column exists
-    if 'transporter_id' not in driver_df_filtered.columns:
-        st.warning("⚠️ Keine transporter_id Spalte in den Daten gefunden. Bitte laden Sie Daten mit Fahrer-Identifikation hoch.")
-        st.info("Erwartete Spaltenamen: transporter_id, driver, fahrer, driverid, fahrer_id")
-    else:
-        # Driver selector
-        drivers = sorted(driver_df_filtered['transporter_id'].dropna().unique())
-        
-        if len(drivers) == 0:
-            st.warning("Keine Fahrer in den Daten gefunden.")
-        else:
-            selected_driver = st.selectbox("Select Driver", drivers)
-            
-            if selected_driver:
-                driver_df_single = driver_df_filtered[driver_df_filtered['transporter_id'] == selected_driver]
-                
-                # Driver metrics
-                col1, col2, col3, col4 = st.columns(4)
-                
-                driver_deliveries = len(driver_df_single)
-                has_concession = 'concession_type' in driver_df_single.columns
-                driver_concessions = driver_df_single['concession_type'].notna().sum() if has_concession else 0
-                driver_rate = driver_concessions / driver_deliveries * 100 if driver_deliveries > 0 else 0
-                
-                col1.metric("Total Deliveries", driver_deliveries)
-                col2.metric("Concessions", driver_concessions if has_concession else "N/A")
-                col3.metric("Rate", f"{driver_rate:.2f}%" if has_concession else "N/A")
-                
-                if len(features_df) > 0 and selected_driver in features_df.index and 'rate_trend_7d' in features_df.columns:
-                    trend = features_df.loc[selected_driver, 'rate_trend_7d']
-                    col4.metric("7d Trend", f"{trend*100:+.2f}%", delta_color="inverse")
-                
-                st.divider()
-                
-                # Feature profile
-                if len(features_df) > 0 and selected_driver in features_df.index:
-                    st.subheader("📊 Feature Profile")
-                    
-                    driver_features = features_df.loc[selected_driver]
-                    
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.markdown("**📈 Historical Rates**")
-                        st.write(f"• 7-day: {driver_features.get('concession_rate_7d', 0)*100:.2f}%")
-                        st.write(f"• 30-day: {driver_features.get('concession_rate_30d', 0)*100:.2f}%")
-                        st.write(f"• 90-day: {driver_features.get('concession_rate_90d', 0)*100:.2f}%")
-                    
-                    with col2:
-                        st.markdown("**📞 Contact Patterns**")
-                        st.write(f"• Success Rate: {driver_features.get('contact_success_rate', 0)*100:.1f}%")
-                        st.write(f"• No-contact Streak: {driver_features.get('no_contact_streak_max', 0):.0f}")
-                    
-                    with col3:
-                        st.markdown("**⏰ Time Patterns**")
-                        st.write(f"• Morning Peak: {driver_features.get('morning_peak_ratio', 0)*100:.1f}%")
-                        st.write(f"• Evening Peak: {driver_features.get('evening_peak_ratio', 0)*100:.1f}%")
-                        st.write(f"• Weekend: {driver_features.get('weekend_ratio', 0)*100:.1f}%")
-                
-                st.divider()
-        
-                # Driver delivery timeline
-                st.subheader("📅 Delivery Timeline")
-                
-                if 'delivery_date_time' in driver_df_single.columns:
-                    driver_df_single = driver_df_single.copy()
-                    driver_df_single['date'] = driver_df_single['delivery_date_time'].dt.date
-                    
-                    if has_concession:
-                        daily = driver_df_single.groupby('date').agg({
-                            'concession_type': lambda x: x.notna().sum(),
-                            'transporter_id': 'count'
-                        }).reset_index()
-                        daily.columns = ['date', 'concessions', 'total']
-                        daily['rate'] = daily['concessions'] / daily['total'] * 100
-                        
-                        fig = go.Figure()
-                        fig.add_trace(go.Bar(x=daily['date'], y=daily['total'], name='Deliveries', marker_color='#90CAF9'))
-                        fig.add_trace(go.Scatter(x=daily['date'], y=daily['rate'], name='Rate %', yaxis='y2', mode='lines+markers', marker_color='#C62828'))
-                        
-                        fig.update_layout(
-                            yaxis=dict(title='Deliveries'),
-                            yaxis2=dict(title='Concession Rate %', overlaying='y', side='right'),
-                            legend=dict(orientation='h', yanchor='bottom', y=1.02),
-                            height=300
-                        )
-                    else:
-                        daily = driver_df_single.groupby('date').size().reset_index(name='total')
-                        
-                        fig = go.Figure()
-                        fig.add_trace(go.Bar(x=daily['date'], y=daily['total'], name='Deliveries', marker_color='#1a237e'))
-                        fig.update_layout(
-                            yaxis=dict(title='Deliveries'),
-                            height=300
-                        )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("Keine Zeitdaten für Timeline verfügbar")
+if has_rows and active_tab == TAB_LABELS[5]:
+    render_driver_profiles_tab(df, features_df, (data_fingerprint,))
 
 
 # =============================================================================
 # TAB 7: DATA MANAGEMENT
 # =============================================================================
 
-with tab7:
+if active_tab == TAB_LABELS[6]:
     render_data_upload_tab(data_manager)
 
 
@@ -788,3 +711,6 @@ st.markdown("""
     <p>Powered by XGBoost, SHAP, and Advanced Pattern Recognition | Multi-Depot Support</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Tab-content styles go last so they don't delay the first paint
+load_deferred_css()
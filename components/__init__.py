@@ -1,5 +1,18 @@
 """Components Package"""
-from .risk_dashboard import render_risk_dashboard
-from .pattern_analysis_tab import render_pattern_analysis
+import importlib
+
+# Submodule providing each exported name. Imported on first access so that
+# loading a light module (e.g. components.ui_components) doesn't pull in the
+# ML stack and Plotly through this package.
+_EXPORTS = {
+    "render_risk_dashboard": ".risk_dashboard",
+    "render_pattern_analysis": ".pattern_analysis_tab",
+}
 
 __all__ = ["render_risk_dashboard", "render_pattern_analysis"]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
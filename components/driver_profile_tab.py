@@ -6,57 +6,128 @@ Renders detailed driver profile views.
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from typing import Optional
+from typing import List, Optional, Tuple
 
+from data_manager import dataframe_fingerprint
 
-def render_driver_profiles_tab(df: pd.DataFrame, features_df: Optional[pd.DataFrame] = None):
+
+def render_driver_profiles_tab(df: pd.DataFrame,
+                               features_df: Optional[pd.DataFrame] = None,
+                               cache_key: Optional[tuple] = None):
     """
     Render the Driver Profiles tab.
     
     Args:
         df: Delivery data DataFrame
         features_df: Pre-computed driver features
+        cache_key: Hashable key identifying df for caching the driver summary;
+            derived from a fingerprint of df when omitted
     """
     st.header("👤 Driver Profiles")
     
+    # Check if transporter_id column exists
+    if 'transporter_id' not in df.columns:
+        st.warning("⚠️ Keine transporter_id Spalte in den Daten gefunden. Bitte laden Sie Daten mit Fahrer-Identifikation hoch.")
+        st.info("Erwartete Spaltenamen: transporter_id, driver, fahrer, driverid, fahrer_id")
+        return
+    
+    if cache_key is None:
+        cache_key = (dataframe_fingerprint(df),)
+    
+    # Totals and daily counts per (depot, driver) from one cached pass; the depot
+    # filter and the driver selection below only slice these small tables
+    summary, daily = _summarize_drivers(df, cache_key)
+    
+    depot_ids = list(df['_depot_id'].unique()) if '_depot_id' in df.columns else None
+    _render_depot_drivers(summary, daily, depot_ids, features_df)
+
+
+@st.fragment
+def _render_depot_drivers(summary: pd.DataFrame,
+                          daily: Optional[pd.DataFrame],
+                          depot_ids: Optional[List[str]],
+                          features_df: Optional[pd.DataFrame]):
+    """Render the depot filter and the driver profiles for the chosen depot"""
     # Depot filter
-    if '_depot_id' in df.columns:
+    if depot_ids is not None:
         col1, col2 = st.columns([1, 2])
         with col1:
             depot_filter = st.selectbox(
                 "Filter by Depot",
-                options=['All'] + list(df['_depot_id'].unique()),
+                options=['All'] + depot_ids,
                 key="driver_depot_filter"
             )
         
         if depot_filter != 'All':
-            driver_df_filtered = df[df['_depot_id'] == depot_filter]
+            summary = _select_depot(summary, depot_filter)
+            daily = _select_depot(daily, depot_filter) if daily is not None else None
         else:
-            driver_df_filtered = df
-    else:
-        driver_df_filtered = df
-    
-    # Check if transporter_id column exists
-    if 'transporter_id' not in driver_df_filtered.columns:
-        st.warning("⚠️ Keine transporter_id Spalte in den Daten gefunden.")
-        st.info("Erwartete Spaltenamen: transporter_id, driver, fahrer, driverid, fahrer_id")
-        return
+            summary = summary.groupby(level='transporter_id', observed=True).sum()
+            if daily is not None:
+                daily = daily.groupby(level=['transporter_id', 'date'], observed=True).sum()
     
     # Driver selector
-    drivers = sorted(driver_df_filtered['transporter_id'].dropna().unique())
+    drivers = sorted(summary.index)
     
     if len(drivers) == 0:
         st.warning("Keine Fahrer in den Daten gefunden.")
         return
         
+    _render_driver_selection(summary, daily, drivers, features_df)
+
+
+@st.cache_data(show_spinner=False)
+def _summarize_drivers(_df: pd.DataFrame, cache_key: tuple) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Per-driver delivery/concession totals and per-driver daily counts.
+    
+    Both are keyed by _depot_id (when present) and transporter_id, so the
+    all-depots view is a sum over the depot level.
+    
+    Returns:
+        (summary indexed by [_depot_id,] transporter_id, daily indexed by
+        [_depot_id,] transporter_id, date - or None without delivery_date_time)
+    """
+    df = _df
+    has_concession = 'concession_type' in df.columns
+    drivers = df['transporter_id']
+    keys = [df['_depot_id'], drivers] if '_depot_id' in df.columns else [drivers]
+    
+    summary = df.groupby(keys, observed=True).size().to_frame('deliveries')
+    if has_concession:
+        summary['concessions'] = df['concession_type'].notna().groupby(keys, observed=True).sum()
+    
+    daily = None
+    if 'delivery_date_time' in df.columns:
+        daily_keys = keys + [df['delivery_date_time'].dt.date.rename('date')]
+        if has_concession:
+            flags = pd.DataFrame({
+                'concessions': df['concession_type'].notna(),
+                'total': drivers.notna()
+            })
+            daily = flags.groupby(daily_keys, observed=True).sum()
+        else:
+            daily = df.groupby(daily_keys, observed=True).size().to_frame('total')
+    
+    return summary, daily
+
+
+def _select_depot(table: pd.DataFrame, depot_id: str) -> pd.DataFrame:
+    """Rows of a depot-keyed summary table for one depot, without the depot level."""
+    return table[table.index.get_level_values('_depot_id') == depot_id].droplevel('_depot_id')
+
+
+@st.fragment
+def _render_driver_selection(summary: pd.DataFrame,
+                             daily: Optional[pd.DataFrame],
+                             drivers: List[str],
+                             features_df: Optional[pd.DataFrame]):
+    """Render the driver selector and the selected driver's profile"""
     selected_driver = st.selectbox("Select Driver", drivers)
     
     if selected_driver:
-        driver_df_single = driver_df_filtered[driver_df_filtered['transporter_id'] == selected_driver]
-        
         # Driver metrics
-        _render_driver_metrics(driver_df_single, selected_driver, features_df)
+        _render_driver_metrics(summary.loc[selected_driver], selected_driver, features_df)
         
         st.divider()
         
@@ -66,16 +137,27 @@ def render_driver_profiles_tab(df: pd.DataFrame, features_df: Optional[pd.DataFr
             st.divider()
         
         # Driver delivery timeline
-        _render_driver_timeline(driver_df_single)
+        _render_driver_timeline(
+            _driver_daily(daily, selected_driver)
+            if daily is not None and selected_driver in daily.index else None
+        )
 
 
-def _render_driver_metrics(driver_df: pd.DataFrame, driver_id: str, features_df: Optional[pd.DataFrame]):
+def _driver_daily(daily: pd.DataFrame, driver_id: str) -> pd.DataFrame:
+    """One driver's daily timeline rows, with the concession rate when available."""
+    driver_daily = daily.loc[driver_id].reset_index()
+    if 'concessions' in driver_daily.columns:
+        driver_daily['rate'] = driver_daily['concessions'] / driver_daily['total'] * 100
+    return driver_daily
+
+
+def _render_driver_metrics(driver_summary: pd.Series, driver_id: str, features_df: Optional[pd.DataFrame]):
     """Render driver metrics row."""
     col1, col2, col3, col4 = st.columns(4)
     
-    driver_deliveries = len(driver_df)
-    has_concession = 'concession_type' in driver_df.columns
-    driver_concessions = driver_df['concession_type'].notna().sum() if has_concession else 0
+    driver_deliveries = int(driver_summary['deliveries'])
+    has_concession = 'concessions' in driver_summary.index
+    driver_concessions = driver_summary['concessions'] if has_concession else 0
     driver_rate = driver_concessions / driver_deliveries * 100 if driver_deliveries > 0 else 0
     
     col1.metric("Total Deliveries", driver_deliveries)
@@ -112,27 +194,23 @@ def _render_feature_profile(driver_features: pd.Series):
         st.write(f"• Weekend: {driver_features.get('weekend_ratio', 0)*100:.1f}%")
 
 
-def _render_driver_timeline(driver_df: pd.DataFrame):
-    """Render driver delivery timeline chart."""
+def _render_driver_timeline(daily: Optional[pd.DataFrame]):
+    """Render driver delivery timeline chart from the driver's daily rows."""
     st.subheader("📅 Delivery Timeline")
     
-    if 'delivery_date_time' not in driver_df.columns:
+    if daily is None:
         st.info("Keine Zeitdaten für Timeline verfügbar")
         return
     
-    driver_df = driver_df.copy()
-    driver_df['date'] = driver_df['delivery_date_time'].dt.date
-    has_concession = 'concession_type' in driver_df.columns
-    
-    if has_concession:
-        daily = driver_df.groupby('date').agg({
-            'concession_type': lambda x: x.notna().sum(),
-            'transporter_id': 'count'
-        }).reset_index()
-        daily.columns = ['date', 'concessions', 'total']
-        daily['rate'] = daily['concessions'] / daily['total'] * 100
-        
-        fig = go.Figure()
+    st.plotly_chart(_build_timeline_figure(daily), use_container_width=True)
+
+
+@st.cache_data(show_spinner=False)
+def _build_timeline_figure(daily: pd.DataFrame):
+    """Build the daily timeline chart, keyed on the (small) daily frame."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    if 'rate' in daily.columns:
         fig.add_trace(go.Bar(x=daily['date'], y=daily['total'], name='Deliveries', marker_color='#90CAF9'))
         fig.add_trace(go.Scatter(x=daily['date'], y=daily['rate'], name='Rate %', yaxis='y2', 
                                   mode='lines+markers', marker_color='#C62828'))
@@ -144,13 +222,9 @@ def _render_driver_timeline(driver_df: pd.DataFrame):
             height=300
         )
     else:
-        daily = driver_df.groupby('date').size().reset_index(name='total')
-        
-        fig = go.Figure()
         fig.add_trace(go.Bar(x=daily['date'], y=daily['total'], name='Deliveries', marker_color='#1a237e'))
         fig.update_layout(
             yaxis=dict(title='Deliveries'),
             height=300
         )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
@@ -6,21 +6,29 @@ Renders the main executive overview dashboard.
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from typing import Optional
 
+from components.ui_components import STATIC_PLOT_CONFIG
+from data_manager import dataframe_fingerprint
 
-def render_overview_tab(df: pd.DataFrame, features_df: Optional[pd.DataFrame] = None):
+
+def render_overview_tab(df: pd.DataFrame,
+                        features_df: Optional[pd.DataFrame] = None,
+                        cache_key: Optional[tuple] = None):
     """
     Render the Executive Overview tab.
     
     Args:
         df: Delivery data DataFrame
         features_df: Pre-computed driver features
+        cache_key: Hashable key identifying df for result caching;
+            derived from a fingerprint of df when omitted
     """
     st.header("📊 Executive Overview")
     
+    if cache_key is None:
+        cache_key = (dataframe_fingerprint(df),)
+    
     # Helper functions
     def safe_col_sum(dataframe, col, condition_func=None):
         if col not in dataframe.columns:
@@ -43,19 +51,21 @@ def render_overview_tab(df: pd.DataFrame, features_df: Optional[pd.DataFrame] =
     
     total_deliveries = len(df)
     total_drivers = df['transporter_id'].nunique() if 'transporter_id' in df.columns else 0
-    total_concessions = df['concession_type'].notna().sum() if has_concession_type(df) else 0
+    # One concession mask shared by the total and the trend halves
+    is_concession = df['concession_type'].notna().to_numpy() if has_concession_type(df) else None
+    total_concessions = is_concession.sum() if is_concession is not None else 0
     concession_rate = total_concessions / total_deliveries * 100 if total_deliveries > 0 else 0
     
-    # Calculate trend
+    # Calculate trend (older vs newer half by delivery time); only the date
+    # column is sorted, the mask is read in that order instead of sorting the frame
     rate_delta = 0
-    if has_concession_type(df) and 'delivery_date_time' in df.columns:
-        df_sorted = df.sort_values('delivery_date_time')
-        if len(df_sorted) > 100:
-            recent = df_sorted.tail(len(df_sorted)//2)
-            previous = df_sorted.head(len(df_sorted)//2)
-            recent_rate = recent['concession_type'].notna().sum() / len(recent) * 100
-            prev_rate = previous['concession_type'].notna().sum() / len(previous) * 100
-            rate_delta = recent_rate - prev_rate
+    if is_concession is not None and 'delivery_date_time' in df.columns and total_deliveries > 100:
+        order = df['delivery_date_time'].reset_index(drop=True).sort_values().index
+        sorted_flags = is_concession[order]
+        half = total_deliveries // 2
+        recent_rate = sorted_flags[total_deliveries - half:].sum() / half * 100
+        prev_rate = sorted_flags[:half].sum() / half * 100
+        rate_delta = recent_rate - prev_rate
     
     col1.metric("Total Deliveries", f"{total_deliveries:,}")
     col2.metric("Active Drivers", total_drivers)
@@ -64,7 +74,8 @@ def render_overview_tab(df: pd.DataFrame, features_df: Optional[pd.DataFrame] =
                 delta=f"{rate_delta:+.2f}%" if rate_delta != 0 else None, delta_color="inverse")
     
     if 'concession_cost' in df.columns:
-        total_cost = df['concession_cost'].sum()
+        # float32 column; accumulate the total in float64
+        total_cost = df['concession_cost'].astype('float64').sum()
         col5.metric("Cost Impact", f"€{total_cost:,.0f}")
     else:
         col5.metric("Records", f"{total_deliveries:,}")
@@ -76,7 +87,7 @@ def render_overview_tab(df: pd.DataFrame, features_df: Optional[pd.DataFrame] =
     
     with col1:
         st.subheader("📈 Daily Trend")
-        _render_daily_trend(df, has_concession_type(df))
+        _render_daily_trend(df, has_concession_type(df), cache_key)
     
     with col2:
         st.subheader("🍩 Concession Type Distribution")
@@ -97,56 +108,51 @@ def render_overview_tab(df: pd.DataFrame, features_df: Optional[pd.DataFrame] =
             _render_need_attention(features_df)
 
 
-def _render_daily_trend(df: pd.DataFrame, has_concession: bool):
+def _render_daily_trend(df: pd.DataFrame, has_concession: bool, cache_key: tuple):
     """Render daily trend chart."""
     if 'delivery_date_time' not in df.columns:
         st.warning("No delivery_date_time column found")
         return
     
-    df = df.copy()
-    df['date'] = df['delivery_date_time'].dt.date
-    
+    # Simple single-series charts use Streamlit's native Vega-Lite charts, which
+    # ship far less JSON per rerun than a Plotly figure. Axis titles come from
+    # the index and column names.
+    daily = _daily_trend(df, cache_key, has_concession)
     if has_concession:
-        daily = df.groupby('date').agg({
-            'concession_type': lambda x: x.notna().sum(),
-            'transporter_id': 'count'
-        }).reset_index()
-        daily.columns = ['date', 'concessions', 'total']
-        daily['rate'] = daily['concessions'] / daily['total'] * 100
+        st.line_chart(daily, height=300)
     else:
-        daily = df.groupby('date').size().reset_index(name='total')
-        daily['rate'] = 0
-        daily['concessions'] = 0
-    
-    daily['date'] = pd.to_datetime(daily['date'])
-    
-    fig = go.Figure()
+        st.bar_chart(daily, height=300)
+
+
+@st.cache_data(show_spinner=False)
+def _daily_trend(_df: pd.DataFrame, cache_key: tuple, has_concession: bool) -> pd.DataFrame:
+    """
+    Daily concession rates (or delivery counts), keyed on the caller's cache
+    key so reruns skip the per-row date conversion instead of rehashing _df.
+    """
+    # Count deliveries per calendar day with np.unique over datetime64[D]
+    # values, instead of building a Python date object per row to group on
+    days = _df['delivery_date_time'].to_numpy(dtype='datetime64[D]')
+    has_date = ~np.isnat(days)
+    day_values, day_codes, day_sizes = np.unique(days[has_date], return_inverse=True, return_counts=True)
+    index = pd.DatetimeIndex(day_values, name='Date')
     
     if has_concession:
-        fig.add_trace(go.Scatter(
-            x=daily['date'], y=daily['rate'],
-            mode='lines+markers',
-            name='Concession Rate',
-            line=dict(color='#1a237e', width=2)
-        ))
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Concession Rate (%)",
-            height=300
+        concessions = np.bincount(
+            day_codes,
+            weights=_df['concession_type'].notna().to_numpy()[has_date],
+            minlength=len(day_values)
         )
-    else:
-        fig.add_trace(go.Bar(
-            x=daily['date'], y=daily['total'],
-            name='Deliveries',
-            marker_color='#1a237e'
-        ))
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Deliveries",
-            height=300
+        # Rates are per delivery with a known driver, as in the weekly depot trend
+        drivers = np.bincount(
+            day_codes,
+            weights=_df['transporter_id'].notna().to_numpy()[has_date],
+            minlength=len(day_values)
         )
-    
-    st.plotly_chart(fig, use_container_width=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = concessions / drivers * 100
+        return pd.DataFrame({'Concession Rate (%)': rate}, index=index)
+    return pd.DataFrame({'Deliveries': day_sizes}, index=index)
 
 
 def _render_concession_distribution(df: pd.DataFrame, has_concession: bool):
@@ -155,32 +161,38 @@ def _render_concession_distribution(df: pd.DataFrame, has_concession: bool):
         st.info("Concession type column not available in data")
         return
     
-    type_counts = df[df['concession_type'].notna()]['concession_type'].value_counts()
+    # value_counts already skips missing values - no need to mask the frame first
+    type_counts = df['concession_type'].value_counts()
     
     if len(type_counts) > 0:
-        fig = px.pie(
-            values=type_counts.values,
-            names=type_counts.index,
-            hole=0.4
-        )
-        fig.update_layout(height=300)
-        st.plotly_chart(fig, use_container_width=True)
+        # The donut labels its slices itself, so it is drawn as a static plot
+        st.plotly_chart(_build_concession_pie(type_counts), use_container_width=True,
+                        config=STATIC_PLOT_CONFIG)
     else:
         st.info("No concessions in selected period")
 
 
+@st.cache_data(show_spinner=False)
+def _build_concession_pie(type_counts: pd.Series):
+    """Build the concession type donut chart, keyed on the (small) counts."""
+    import plotly.express as px
+    fig = px.pie(
+        values=type_counts.values,
+        names=type_counts.index,
+        hole=0.4
+    )
+    fig.update_layout(height=300)
+    return fig
+
+
 def _render_top_performers(features_df: pd.DataFrame):
     """Render top performing drivers table."""
     if 'concession_rate_30d' not in features_df.columns:
         st.info("No rate data available")
         return
     
-    top_drivers = features_df.nsmallest(5, 'concession_rate_30d')[['concession_rate_30d']]
-    if '_depot_id' in features_df.columns:
-        top_drivers['depot'] = features_df.loc[top_drivers.index, '_depot_id']
-    top_drivers['rate'] = (top_drivers['concession_rate_30d'] * 100).round(2).astype(str) + '%'
-    display_cols = ['depot', 'rate'] if 'depot' in top_drivers.columns else ['rate']
-    st.dataframe(top_drivers[display_cols], use_container_width=True)
+    top_drivers = features_df.nsmallest(5, 'concession_rate_30d')
+    st.dataframe(_driver_rate_table(top_drivers), use_container_width=True)
 
 
 def _render_need_attention(features_df: pd.DataFrame):
@@ -189,10 +201,21 @@ def _render_need_attention(features_df: pd.DataFrame):
         st.info("No rate data available")
         return
     
-    bottom_drivers = features_df.nlargest(5, 'concession_rate_30d')[['concession_rate_30d', 'rate_trend_7d']]
-    if '_depot_id' in features_df.columns:
-        bottom_drivers['depot'] = features_df.loc[bottom_drivers.index, '_depot_id']
-    bottom_drivers['rate'] = (bottom_drivers['concession_rate_30d'] * 100).round(2).astype(str) + '%'
-    bottom_drivers['trend'] = bottom_drivers['rate_trend_7d'].apply(lambda x: '📈' if x > 0 else '📉')
-    display_cols = ['depot', 'rate', 'trend'] if 'depot' in bottom_drivers.columns else ['rate', 'trend']
-    st.dataframe(bottom_drivers[display_cols], use_container_width=True)
+    bottom_drivers = features_df.nlargest(5, 'concession_rate_30d')
+    table = _driver_rate_table(bottom_drivers)
+    table['trend'] = np.where(bottom_drivers['rate_trend_7d'] > 0, '📈', '📉')
+    st.dataframe(table, use_container_width=True)
+
+
+def _driver_rate_table(drivers: pd.DataFrame) -> pd.DataFrame:
+    """
+    Display table (depot if known, formatted 30-day rate) for a few drivers.
+    
+    Built from just the displayed columns, rather than copying the feature
+    rows, adding columns and then slicing them out again.
+    """
+    table = pd.DataFrame(index=drivers.index)
+    if '_depot_id' in drivers.columns:
+        table['depot'] = drivers['_depot_id']
+    table['rate'] = (drivers['concession_rate_30d'] * 100).round(2).astype(str) + '%'
+    return table
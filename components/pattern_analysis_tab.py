@@ -8,7 +8,6 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 
@@ -16,16 +15,72 @@ import sys
 sys.path.append('..')
 from ml_engine.pattern_recognition import PatternAnalyzer, Pattern, AnomalyResult, TrendAnalysis
 from ml_engine.feature_engineering import FeatureEngineer
+from data_manager import dataframe_fingerprint
+from components.ui_components import STATIC_PLOT_CONFIG, render_bar_list
+
+
+# Expander icon per pattern severity
+SEVERITY_ICONS = {
+    "critical": "🔴",
+    "warning": "🟡",
+    "info": "🔵"
+}
+
+# Time heatmap rows, and its (color label, color scale, title) with and
+# without concession data
+WEEKDAY_NAMES_DE = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+TIME_HEATMAP_STYLES = {
+    True: ("Konzessionsrate", 'RdYlGn_r', "Konzessionsrate nach Zeit (Rot = Hoch, Grün = Niedrig)"),
+    False: ("Zustellungen", 'Blues', "Zustellvolumen nach Zeit"),
+}
+
+# Columns of the concerning-trends table
+CONCERNING_TREND_COLUMNS = ['transporter_id', 'current_rate', 'slope', 'forecast_7d']
+
+
+# =============================================================================
+# CACHED ANALYSES
+# =============================================================================
+# Every widget change reruns the script. The analyses below only depend on the
+# data, so they are memoized on a cache key describing it (the frames are
+# underscore arguments and never hashed by Streamlit).
+
+@st.cache_data(show_spinner=False)
+def _time_patterns(_pa: PatternAnalyzer, _df: pd.DataFrame, cache_key: tuple, scope: Optional[str]):
+    return _pa.detect_time_patterns(_df)
+
+
+@st.cache_data(show_spinner=False)
+def _trend(_pa: PatternAnalyzer, _df: pd.DataFrame, cache_key: tuple, scope: Optional[str], window_days: int):
+    return _pa.analyze_trend(_df, window_days=window_days)
+
+
+@st.cache_data(show_spinner=False)
+def _trends_by_transporter(_pa: PatternAnalyzer, _df: pd.DataFrame, cache_key: tuple, window_days: int):
+    return _pa.analyze_trends_by_transporter(_df, window_days=window_days)
+
+
+@st.cache_data(show_spinner=False)
+def _anomalies(_pa: PatternAnalyzer, _df: pd.DataFrame, cache_key: tuple, threshold_std: float):
+    return _pa.detect_anomalies(_df, threshold_std=threshold_std)
+
+
+@st.cache_data(show_spinner=False)
+def _clusters(_pa: PatternAnalyzer, _features_df: pd.DataFrame, cache_key: tuple):
+    return _pa.cluster_drivers(_features_df)
 
 
 def render_pattern_analysis(df: pd.DataFrame,
-                            features_df: Optional[pd.DataFrame] = None):
+                            features_df: Optional[pd.DataFrame] = None,
+                            cache_key: Optional[tuple] = None):
     """
     Render the pattern analysis tab.
     
     Args:
         df: Raw delivery data
         features_df: Pre-computed features (optional)
+        cache_key: Hashable key identifying df/features_df for result caching;
+            derived from a fingerprint of df when omitted
     """
     st.header("🔬 Advanced Pattern Recognition")
     st.markdown("*AI-powered detection of patterns, trends, and anomalies*")
@@ -38,32 +93,46 @@ def render_pattern_analysis(df: pd.DataFrame,
             fe = FeatureEngineer()
             features_df = fe.transform(df)
     
-    # Tab layout
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    if cache_key is None:
+        cache_key = (dataframe_fingerprint(df),)
+    
+    # View selector - only the selected analysis is computed on a rerun
+    views = [
         "📅 Time Patterns",
         "📈 Trend Analysis",
         "🚨 Anomalies",
         "👥 Driver Clusters",
         "🔗 Correlations"
-    ])
-    
-    with tab1:
-        render_time_patterns(df, pa)
-    
-    with tab2:
-        render_trend_analysis(df, pa, features_df)
-    
-    with tab3:
-        render_anomalies(df, pa)
-    
-    with tab4:
-        render_clustering(features_df, pa)
+    ]
+    view = st.radio(
+        "Analysis",
+        views,
+        horizontal=True,
+        key="pattern_view",
+        label_visibility="collapsed"
+    )
     
-    with tab5:
+    # The feature matrix already holds one row per driver - reuse its index as the
+    # driver list instead of re-scanning the raw transporter_id column
+    drivers = features_df.index.tolist()
+    
+    if view == views[0]:
+        render_time_patterns(df, pa, drivers, cache_key)
+    elif view == views[1]:
+        render_trend_analysis(df, pa, features_df, drivers, cache_key)
+    elif view == views[2]:
+        render_anomalies(df, pa, cache_key)
+    elif view == views[3]:
+        render_clustering(features_df, pa, cache_key)
+    else:
         render_correlations(features_df, pa)
 
 
-def render_time_patterns(df: pd.DataFrame, pa: PatternAnalyzer):
+@st.fragment
+def render_time_patterns(df: pd.DataFrame,
+                         pa: PatternAnalyzer,
+                         drivers: Optional[List[str]] = None,
+                         cache_key: tuple = ()):
     """Render time-based pattern analysis"""
     st.subheader("Time-Based Patterns")
     
@@ -76,15 +145,19 @@ def render_time_patterns(df: pd.DataFrame, pa: PatternAnalyzer):
             ["Organization-wide", "Single Driver"]
         )
     
+    scope_df = df
     transporter_id = None
     if analysis_scope == "Single Driver":
         with col2:
-            drivers = df['transporter_id'].unique().tolist()
+            if drivers is None:
+                drivers = df['transporter_id'].unique().tolist()
             transporter_id = st.selectbox("Select Driver", drivers)
+        # Select the driver's rows once for both the pattern search and the heatmap
+        scope_df = df[df['transporter_id'] == transporter_id]
     
     # Get patterns
     with st.spinner("Analyzing time patterns..."):
-        patterns = pa.detect_time_patterns(df, transporter_id)
+        patterns = _time_patterns(pa, scope_df, cache_key, transporter_id)
     
     if not patterns:
         st.info("No significant time patterns detected in the data.")
@@ -92,39 +165,32 @@ def render_time_patterns(df: pd.DataFrame, pa: PatternAnalyzer):
         st.success(f"Found {len(patterns)} time-based patterns")
         
         for p in patterns:
-            severity_color = {
-                "critical": "🔴",
-                "warning": "🟡",
-                "info": "🔵"
-            }
-            
-            with st.expander(f"{severity_color.get(p.severity, '⚪')} {p.description}", expanded=True):
+            with st.expander(f"{SEVERITY_ICONS.get(p.severity, '⚪')} {p.description}", expanded=True):
                 col1, col2 = st.columns([2, 1])
                 
                 with col1:
-                    st.markdown(f"**Pattern Type:** {p.pattern_type}")
-                    st.markdown(f"**Confidence:** {p.confidence*100:.0f}%")
-                    st.markdown(f"**Affected:** {p.affected_entity}")
-                    
+                    # One markdown element per pattern rather than one per line
+                    lines = [
+                        f"**Pattern Type:** {p.pattern_type}",
+                        f"**Confidence:** {p.confidence*100:.0f}%",
+                        f"**Affected:** {p.affected_entity}",
+                    ]
                     if p.recommendations:
-                        st.markdown("**Recommendations:**")
-                        for rec in p.recommendations:
-                            st.markdown(f"• {rec}")
+                        lines.append("**Recommendations:**")
+                        lines.extend(f"• {rec}" for rec in p.recommendations)
+                    st.markdown("\n\n".join(lines))
                 
                 with col2:
                     # Visualize pattern details
                     if p.pattern_type == "weekday_concentration":
                         rates = p.details.get("all_weekday_rates", {})
                         if rates:
-                            fig = px.bar(
-                                x=list(rates.keys()),
-                                y=list(rates.values()),
-                                labels={'x': 'Weekday', 'y': 'Concession Rate'},
-                                color=list(rates.values()),
-                                color_continuous_scale='Reds'
+                            render_bar_list(
+                                list(rates.items()),
+                                title="Concession Rate by Weekday",
+                                value_format="{:.1%}",
+                                color="#C62828"
                             )
-                            fig.update_layout(height=200, margin=dict(l=0, r=0, t=0, b=0), showlegend=False)
-                            st.plotly_chart(fig, use_container_width=True)
                     
                     elif p.pattern_type == "peak_hours":
                         rates = p.details.get("all_hour_rates", {})
@@ -136,19 +202,25 @@ def render_time_patterns(df: pd.DataFrame, pa: PatternAnalyzer):
                                 markers=True
                             )
                             fig.update_layout(height=200, margin=dict(l=0, r=0, t=0, b=0))
-                            st.plotly_chart(fig, use_container_width=True)
+                            # Inline preview only: a static plot skips Plotly's event handling
+                            st.plotly_chart(fig, use_container_width=True, config=STATIC_PLOT_CONFIG)
     
     # Heatmap visualization
     st.markdown("---")
     st.subheader("📊 Time Heatmap")
     
-    render_time_heatmap(df, transporter_id)
+    render_time_heatmap(scope_df, cache_key=cache_key + (transporter_id,))
 
 
-def render_time_heatmap(df: pd.DataFrame, transporter_id: Optional[str] = None):
-    """Render heatmap of concessions by hour and weekday"""
-    df = df.copy()
+def render_time_heatmap(df: pd.DataFrame,
+                        transporter_id: Optional[str] = None,
+                        cache_key: Optional[tuple] = None):
+    """
+    Render heatmap of concessions by hour and weekday.
     
+    With a cache_key identifying df, the weekday x hour table is memoized, so
+    reruns skip extracting the hour and weekday of every row.
+    """
     if transporter_id:
         df = df[df['transporter_id'] == transporter_id]
     
@@ -157,64 +229,65 @@ def render_time_heatmap(df: pd.DataFrame, transporter_id: Optional[str] = None):
         st.info("Keine Zeitdaten für Heatmap verfügbar")
         return
     
-    df['delivery_date_time'] = pd.to_datetime(df['delivery_date_time'], errors='coerce')
-    df['hour'] = df['delivery_date_time'].dt.hour
-    df['dayofweek'] = df['delivery_date_time'].dt.dayofweek
-    
-    # Handle missing concession_type column
-    if 'concession_type' in df.columns:
-        df['is_concession'] = df['concession_type'].notna() & (df['concession_type'] != '')
+    if cache_key is None:
+        pivot = _time_heatmap_table(df)
     else:
-        st.info("Keine Konzessionstyp-Spalte vorhanden. Zeige Zustellvolumen.")
-        # Show delivery volume instead
-        heatmap_data = df.groupby(['dayofweek', 'hour']).size().reset_index(name='count')
-        pivot = heatmap_data.pivot(index='dayofweek', columns='hour', values='count').fillna(0)
-        weekday_names = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
-        
-        fig = px.imshow(
-            pivot.values,
-            labels=dict(x="Stunde", y="Wochentag", color="Zustellungen"),
-            x=[f"{h}:00" for h in pivot.columns],
-            y=[weekday_names[i] for i in pivot.index],
-            color_continuous_scale='Blues',
-            aspect='auto'
-        )
-        fig.update_layout(title="Zustellvolumen nach Zeit", height=300)
-        st.plotly_chart(fig, use_container_width=True)
-        return
-    
-    # Calculate rates
-    heatmap_data = df.groupby(['dayofweek', 'hour']).agg({
-        'is_concession': ['sum', 'count']
-    }).reset_index()
-    heatmap_data.columns = ['dayofweek', 'hour', 'concessions', 'total']
-    heatmap_data['rate'] = heatmap_data['concessions'] / heatmap_data['total']
-    
-    # Pivot for heatmap
-    pivot = heatmap_data.pivot(index='dayofweek', columns='hour', values='rate')
+        pivot = _time_heatmap(df, cache_key, transporter_id)
     
-    weekday_names = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+    # Concession rates, or delivery volume without a concession_type column
+    has_concession = 'concession_type' in df.columns
+    if not has_concession:
+        st.info("Keine Konzessionstyp-Spalte vorhanden. Zeige Zustellvolumen.")
+    color_label, color_scale, title = TIME_HEATMAP_STYLES[has_concession]
     
     fig = px.imshow(
         pivot.values,
-        labels=dict(x="Stunde", y="Wochentag", color="Konzessionsrate"),
+        labels=dict(x="Stunde", y="Wochentag", color=color_label),
         x=[f"{h}:00" for h in pivot.columns],
-        y=[weekday_names[i] for i in pivot.index],
-        color_continuous_scale='RdYlGn_r',
+        y=[WEEKDAY_NAMES_DE[i] for i in pivot.index],
+        color_continuous_scale=color_scale,
         aspect='auto'
     )
-    
-    fig.update_layout(
-        title="Konzessionsrate nach Zeit (Rot = Hoch, Grün = Niedrig)",
-        height=300
-    )
+    fig.update_layout(title=title, height=300)
     
     st.plotly_chart(fig, use_container_width=True)
 
 
+@st.cache_data(show_spinner=False)
+def _time_heatmap(_df: pd.DataFrame, cache_key: tuple, scope: Optional[str]) -> pd.DataFrame:
+    return _time_heatmap_table(_df)
+
+
+def _time_heatmap_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Weekday x hour concession rates, or delivery counts without concession_type.
+    """
+    # Group on weekday/hour key Series instead of copying the frame to add
+    # them as columns; sort=False skips sorting groups the pivot reorders anyway
+    dates = df['delivery_date_time']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    keys = [dates.dt.dayofweek.rename('dayofweek'), dates.dt.hour.rename('hour')]
+    
+    if 'concession_type' not in df.columns:
+        return _pivot_hours(df.groupby(keys, sort=False).size()).fillna(0)
+    
+    is_concession = df['concession_type'].notna() & (df['concession_type'] != '')
+    counts = is_concession.groupby(keys, sort=False).agg(['sum', 'count'])
+    return _pivot_hours(counts['sum'] / counts['count'])
+
+
+def _pivot_hours(values: pd.Series) -> pd.DataFrame:
+    """Weekday x hour table of a (dayofweek, hour) indexed Series, both axes sorted."""
+    return values.unstack('hour').sort_index().sort_index(axis=1)
+
+
+@st.fragment
 def render_trend_analysis(df: pd.DataFrame, 
                           pa: PatternAnalyzer,
-                          features_df: pd.DataFrame):
+                          features_df: pd.DataFrame,
+                          drivers: Optional[List[str]] = None,
+                          cache_key: tuple = ()):
     """Render trend analysis section"""
     st.subheader("Trend Analysis")
     
@@ -224,17 +297,20 @@ def render_trend_analysis(df: pd.DataFrame,
     with col1:
         scope = st.radio("Scope", ["Organization", "Driver"], horizontal=True)
     
+    scope_df = df
     transporter_id = None
     if scope == "Driver":
         with col2:
-            drivers = df['transporter_id'].unique().tolist()
+            if drivers is None:
+                drivers = features_df.index.tolist()
             transporter_id = st.selectbox("Select Driver", drivers, key="trend_driver")
+        scope_df = df[df['transporter_id'] == transporter_id]
     
     with col3:
         window = st.selectbox("Analysis Window", [30, 60, 90], index=0)
     
     # Get trend
-    trend = pa.analyze_trend(df, transporter_id, window_days=window)
+    trend = _trend(pa, scope_df, cache_key, transporter_id, window)
     
     # Display trend metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -247,23 +323,23 @@ def render_trend_analysis(df: pd.DataFrame,
     col4.metric("30-Day Forecast", f"{trend.forecast_30d*100:.2f}%")
     
     # Trend visualization
-    render_trend_chart(df, transporter_id, window)
+    render_trend_chart(scope_df, None, window)
     
     # Multi-driver comparison
     if scope == "Organization":
         st.markdown("---")
         st.subheader("📊 Driver Trend Comparison")
-        render_driver_trend_comparison(df, pa, features_df)
+        render_driver_trend_comparison(df, pa, features_df, cache_key)
 
 
 def render_trend_chart(df: pd.DataFrame, 
                        transporter_id: Optional[str], 
                        window_days: int):
     """Render trend line chart with forecast"""
-    df = df.copy()
-    
+    # Filter before copying so a single driver doesn't copy the whole dataset
     if transporter_id:
         df = df[df['transporter_id'] == transporter_id]
+    df = df.copy()
     
     df['delivery_date_time'] = pd.to_datetime(df['delivery_date_time'], errors='coerce')
     df['date'] = df['delivery_date_time'].dt.date
@@ -323,15 +399,14 @@ def render_trend_chart(df: pd.DataFrame,
 
 def render_driver_trend_comparison(df: pd.DataFrame, 
                                    pa: PatternAnalyzer,
-                                   features_df: pd.DataFrame):
+                                   features_df: pd.DataFrame,
+                                   cache_key: tuple = ()):
     """Compare trends across drivers"""
     
     # Get trends for all drivers
     trends_data = []
     
-    for transporter_id in df['transporter_id'].unique():
-        trend = pa.analyze_trend(df, transporter_id, window_days=30)
-        
+    for transporter_id, trend in _trends_by_transporter(pa, df, cache_key, 30).items():
         rate_30d = features_df.loc[transporter_id, 'concession_rate_30d'] if transporter_id in features_df.index else 0
         
         trends_data.append({
@@ -376,18 +451,20 @@ def render_driver_trend_comparison(df: pd.DataFrame,
     st.plotly_chart(fig, use_container_width=True)
     
     # Table of concerning trends
-    concerning = trends_df[
+    # Selects the displayed columns with the rows, so only those are copied
+    concerning = trends_df.loc[
         (trends_df['direction'] == 'increasing') & 
-        (trends_df['significant'] == True)
+        (trends_df['significant'] == True),
+        CONCERNING_TREND_COLUMNS
     ].head(10)
     
     if len(concerning) > 0:
         st.warning(f"⚠️ {len(concerning)} drivers showing significant upward trends:")
-        st.dataframe(concerning[['transporter_id', 'current_rate', 'slope', 'forecast_7d']], 
-                     use_container_width=True, hide_index=True)
+        st.dataframe(concerning, use_container_width=True, hide_index=True)
 
 
-def render_anomalies(df: pd.DataFrame, pa: PatternAnalyzer):
+@st.fragment
+def render_anomalies(df: pd.DataFrame, pa: PatternAnalyzer, cache_key: tuple = ()):
     """Render anomaly detection results"""
     st.subheader("🚨 Anomaly Detection")
     st.markdown("*Unusual driver behavior that deviates from normal patterns*")
@@ -401,7 +478,7 @@ def render_anomalies(df: pd.DataFrame, pa: PatternAnalyzer):
     
     # Detect anomalies
     with st.spinner("Detecting anomalies..."):
-        anomalies = pa.detect_anomalies(df, threshold_std=threshold)
+        anomalies = _anomalies(pa, df, cache_key, threshold)
     
     if not anomalies:
         st.success("✅ No significant anomalies detected!")
@@ -452,14 +529,14 @@ def render_anomalies(df: pd.DataFrame, pa: PatternAnalyzer):
     st.dataframe(anomaly_table, use_container_width=True, hide_index=True)
 
 
-def render_clustering(features_df: pd.DataFrame, pa: PatternAnalyzer):
+def render_clustering(features_df: pd.DataFrame, pa: PatternAnalyzer, cache_key: tuple = ()):
     """Render driver clustering analysis"""
     st.subheader("👥 Driver Behavior Clusters")
     st.markdown("*Grouping drivers by similar behavior patterns*")
     
     # Run clustering
     with st.spinner("Clustering drivers..."):
-        clusters = pa.cluster_drivers(features_df)
+        clusters = _clusters(pa, features_df, cache_key)
     
     if "error" in clusters:
         st.error(clusters["error"])
@@ -540,12 +617,11 @@ def render_correlations(features_df: pd.DataFrame, pa: PatternAnalyzer):
             color = "#C62828" if corr > 0 else "#2E7D32"
             
             with st.expander(f"{icon} {feature}: r = {corr:.3f}"):
-                st.markdown(f"**{c.description}**")
-                
+                lines = [f"**{c.description}**"]
                 if c.recommendations:
-                    st.markdown("**Actionable Insights:**")
-                    for rec in c.recommendations:
-                        st.markdown(f"• {rec}")
+                    lines.append("**Actionable Insights:**")
+                    lines.extend(f"• {rec}" for rec in c.recommendations)
+                st.markdown("\n\n".join(lines))
     
     # Full correlation heatmap
     st.markdown("### Correlation Matrix")
@@ -3,11 +3,11 @@ Risk Dashboard Component
 Streamlit UI for displaying ML-based driver risk predictions.
 """
 
+import heapq
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from typing import List, Optional
 from datetime import datetime
 
@@ -15,6 +15,15 @@ import sys
 sys.path.append('..')
 from ml_engine.risk_model import DriverRiskModel, PredictionResult
 from ml_engine.feature_engineering import FeatureEngineer
+from components.ui_components import render_bar_list
+
+
+# Metric icon per risk category
+RISK_CATEGORY_ICONS = {
+    "high": "🔴",
+    "medium": "🟡",
+    "low": "🟢"
+}
 
 
 def render_risk_dashboard(df: pd.DataFrame, 
@@ -141,6 +150,7 @@ def render_risk_distribution(predictions: List[PredictionResult]):
         'high': '#C62828'      # Red
     }
     
+    import plotly.express as px
     fig = px.histogram(
         df_plot,
         x='Risk Score',
@@ -186,6 +196,7 @@ def render_risk_summary(predictions: List[PredictionResult]):
     st.metric("Average Risk Score", f"{avg_score:.1f}/100")
     
     # Gauge chart
+    import plotly.graph_objects as go
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
         value=avg_score,
@@ -216,33 +227,39 @@ def render_high_risk_drivers(predictions: List[PredictionResult],
     """Render table of high-risk drivers"""
     st.subheader("🚨 High Risk Drivers - Immediate Attention Required")
     
-    # Get high and medium risk drivers
-    at_risk = [p for p in predictions if p.risk_category in ["high", "medium"]]
-    at_risk.sort(key=lambda x: x.risk_score, reverse=True)
+    # Top 15 high and medium risk drivers (partial selection, no full sort)
+    at_risk = heapq.nlargest(
+        15,
+        (p for p in predictions if p.risk_category in ["high", "medium"]),
+        key=lambda x: x.risk_score
+    )
     
     if not at_risk:
         st.success("✅ No high-risk drivers detected!")
         return
     
-    # Build table data
-    table_data = []
-    for p in at_risk[:15]:  # Top 15
-        top_factor = p.top_factors[0] if p.top_factors else {"feature": "N/A", "direction": ""}
-        
-        # Get feature values
-        driver_features = features_df.loc[p.transporter_id] if p.transporter_id in features_df.index else {}
-        
-        table_data.append({
-            "Driver ID": p.transporter_id,
-            "Risk Score": p.risk_score,
-            "Category": p.risk_category.upper(),
-            "30d Rate": f"{driver_features.get('concession_rate_30d', 0)*100:.1f}%" if isinstance(driver_features, pd.Series) else "N/A",
-            "Trend": "📈" if driver_features.get('rate_trend_7d', 0) > 0 else "📉" if isinstance(driver_features, pd.Series) else "-",
-            "Top Factor": top_factor.get("feature", "N/A"),
-            "Confidence": f"{p.confidence*100:.0f}%"
-        })
-    
-    df_table = pd.DataFrame(table_data)
+    # Build table columns in one pass: a single reindex replaces per-driver .loc lookups
+    # and fills missing drivers and missing feature columns with 0 in the same step
+    driver_ids = [p.transporter_id for p in at_risk]
+    driver_features = (
+        features_df.reindex(columns=['concession_rate_30d', 'rate_trend_7d'], fill_value=0.0)
+        .reindex(driver_ids, fill_value=0.0)
+        .fillna(0)
+    )
+    has_features = pd.Index(driver_ids).isin(features_df.index)
+    
+    rate_30d = driver_features['concession_rate_30d']
+    trend_7d = driver_features['rate_trend_7d']
+    
+    df_table = pd.DataFrame({
+        "Driver ID": driver_ids,
+        "Risk Score": [p.risk_score for p in at_risk],
+        "Category": [p.risk_category.upper() for p in at_risk],
+        "30d Rate": np.where(has_features, (rate_30d * 100).map("{:.1f}%".format), "N/A"),
+        "Trend": np.where(trend_7d > 0, "📈", np.where(has_features, "📉", "-")),
+        "Top Factor": [p.top_factors[0].get("feature", "N/A") if p.top_factors else "N/A" for p in at_risk],
+        "Confidence": [f"{p.confidence*100:.0f}%" for p in at_risk]
+    })
     
     # Style the table
     def style_risk(val):
@@ -255,16 +272,26 @@ def render_high_risk_drivers(predictions: List[PredictionResult],
     styled = df_table.style.applymap(style_risk, subset=["Category"])
     st.dataframe(styled, use_container_width=True, hide_index=True)
     
-    # Download button
-    csv = df_table.to_csv(index=False)
+    _render_risk_export(df_table)
+
+
+@st.fragment
+def _render_risk_export(df_table: pd.DataFrame):
+    """Render the risk report download button"""
     st.download_button(
         label="📥 Download Risk Report",
-        data=csv,
+        data=_risk_report_csv(tuple(df_table.columns), tuple(df_table.itertuples(index=False, name=None))),
         file_name=f"risk_report_{datetime.now().strftime('%Y%m%d')}.csv",
         mime="text/csv"
     )
 
 
+@st.cache_data(show_spinner=False)
+def _risk_report_csv(columns: tuple, rows: tuple) -> str:
+    """Risk report CSV, keyed on the (at most 15) table rows"""
+    return pd.DataFrame(list(rows), columns=list(columns)).to_csv(index=False)
+
+
 def render_feature_importance(model: DriverRiskModel):
     """Render feature importance chart"""
     st.subheader("📊 Key Risk Factors")
@@ -275,25 +302,14 @@ def render_feature_importance(model: DriverRiskModel):
     # Take top 15
     top_features = importance.head(15)
     
-    fig = px.bar(
-        top_features,
-        x='importance',
-        y='feature',
-        orientation='h',
+    # Fifteen bars: plain HTML bars instead of a Plotly figure
+    render_bar_list(
+        list(zip(top_features['feature'], top_features['importance'])),
         title="Feature Importance (Top 15)",
-        color='importance',
-        color_continuous_scale='Reds'
+        value_format="{:.3f}",
+        color="#C62828"
     )
     
-    fig.update_layout(
-        yaxis={'categoryorder': 'total ascending'},
-        xaxis_title="Importance Score",
-        yaxis_title="Feature",
-        coloraxis_showscale=False
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
-    
     # Explanation
     with st.expander("📖 Understanding Feature Importance"):
         st.markdown("""
@@ -310,39 +326,33 @@ def render_feature_importance(model: DriverRiskModel):
         """)
 
 
+@st.fragment
 def render_driver_deep_dive(predictions: List[PredictionResult],
                             features_df: pd.DataFrame,
                             raw_df: pd.DataFrame):
     """Render detailed view for a selected driver"""
     st.subheader("🔍 Driver Deep Dive")
     
-    # Driver selector
-    transporter_ids = [p.transporter_id for p in predictions]
-    
-    # Sort by risk score for easier selection
+    # Driver selector, sorted by risk score for easier selection. Options are the
+    # driver IDs themselves, so the selection maps straight back to its prediction.
     sorted_predictions = sorted(predictions, key=lambda x: x.risk_score, reverse=True)
+    predictions_by_id = {p.transporter_id: p for p in sorted_predictions}
     
-    options = [f"{p.transporter_id} (Risk: {p.risk_score:.0f})" for p in sorted_predictions]
-    
-    selected = st.selectbox("Select Driver", options)
-    
-    if not selected:
-        return
-    
-    selected_id = selected.split(" (")[0]
+    selected_id = st.selectbox(
+        "Select Driver",
+        list(predictions_by_id),
+        format_func=lambda tid: f"{tid} (Risk: {predictions_by_id[tid].risk_score:.0f})"
+    )
     
-    # Find prediction
-    pred = next((p for p in predictions if p.transporter_id == selected_id), None)
+    pred = predictions_by_id.get(selected_id)
     if pred is None:
         return
     
     # Display risk metrics
     col1, col2, col3, col4 = st.columns(4)
     
-    color = "🔴" if pred.risk_category == "high" else "🟡" if pred.risk_category == "medium" else "🟢"
-    
     col1.metric("Risk Score", f"{pred.risk_score:.0f}/100")
-    col2.metric("Category", f"{color} {pred.risk_category.upper()}")
+    col2.metric("Category", f"{RISK_CATEGORY_ICONS.get(pred.risk_category, '🟢')} {pred.risk_category.upper()}")
     col3.metric("Confidence", f"{pred.confidence*100:.0f}%")
     col4.metric("Probability", f"{pred.probability*100:.1f}%")
     
@@ -3,17 +3,103 @@ LTS Quality Management - UI Components
 Reusable Streamlit components for enterprise-grade UI
 """
 
+import html
+import re
 import streamlit as st
-from typing import Optional, Union, List, Dict
+from typing import Optional, Union, List, Dict, Tuple
 from pathlib import Path
 
 
+# Linked ahead of the theme <style> block so the font fetch starts in parallel;
+# display=swap renders fallback text immediately instead of blocking on the font
+FONT_LINKS = (
+    '<link rel="preconnect" href="https://fonts.googleapis.com">'
+    '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+    '<link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap">'
+)
+
+
+# Badge colors per status (English and German labels) and padding/font per size
+STATUS_BADGE_STYLES = {
+    "high": {"bg": "#C62828", "text": "#FFFFFF"},
+    "hoch": {"bg": "#C62828", "text": "#FFFFFF"},
+    "medium": {"bg": "#F9A825", "text": "#333333"},
+    "mittel": {"bg": "#F9A825", "text": "#333333"},
+    "low": {"bg": "#2E7D32", "text": "#FFFFFF"},
+    "niedrig": {"bg": "#2E7D32", "text": "#FFFFFF"},
+    "success": {"bg": "#2E7D32", "text": "#FFFFFF"},
+    "warning": {"bg": "#F9A825", "text": "#333333"},
+    "error": {"bg": "#C62828", "text": "#FFFFFF"},
+}
+
+STATUS_BADGE_SIZES = {
+    "small": "0.2rem 0.5rem; font-size: 0.7rem",
+    "normal": "0.3rem 0.75rem; font-size: 0.8rem",
+    "large": "0.4rem 1rem; font-size: 0.9rem"
+}
+
+
+# Plotly config for summary charts that need no zoom, pan or hover: a static
+# plot registers no event handlers and shows no mode bar
+STATIC_PLOT_CONFIG = {'staticPlot': True, 'displayModeBar': False}
+
+
+# Per-item HTML for the list renderers, filled with str.format in their loops
+ACTION_ITEM_TEMPLATE = "<li style='margin: 0.25rem 0;'>{item}</li>"
+
+STAT_ITEM_TEMPLATE = """
+        <div style="flex: 1; text-align: center; padding: 0.5rem;">
+            <div style="font-size: 1.25rem; font-weight: 600; color: #0D47A1;">{value}</div>
+            <div style="font-size: 0.75rem; color: #718096; text-transform: uppercase;">{label}</div>
+        </div>"""
+
+BAR_ROW_TEMPLATE = """
+        <div style="display: flex; align-items: center; gap: 0.5rem; margin: 0.25rem 0;">
+            <div style="width: 40%; font-size: 0.8rem; color: #4A5568; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;" title="{label}">{label}</div>
+            <div style="flex: 1; background: #EDF2F7; height: 0.9rem; border-radius: 3px;">
+                <div style="width: {width:.1f}%; height: 100%; background: {color}; border-radius: 3px;"></div>
+            </div>
+            <div style="width: 4rem; text-align: right; font-size: 0.8rem; color: #1A1A2E;">{value}</div>
+        </div>"""
+
+
+@st.cache_resource(show_spinner=False)
+def _custom_style_html(file_name: str = "style.css", head: str = "") -> str:
+    """
+    Build the markup for a theme stylesheet once per server process.
+    
+    The CSS is read without comments and indentation and wrapped in its
+    <style> tag (after head, if given), so reruns only re-emit a cached string.
+    Returns "" when the stylesheet is missing or empty.
+    """
+    css_path = Path(__file__).parent.parent / "assets" / file_name
+    if not css_path.exists():
+        return ""
+    with open(css_path, 'r', encoding='utf-8') as f:
+        css = f.read()
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};])\s*', r'\1', css).strip()
+    return f"{head}<style>{css}</style>" if css else ""
+
+
 def load_custom_css():
-    """Load the custom LTS theme CSS"""
-    css_path = Path(__file__).parent.parent / "assets" / "style.css"
-    if css_path.exists():
-        with open(css_path, 'r', encoding='utf-8') as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    """Load the LTS theme CSS needed for the first paint (layout, sidebar, alerts)"""
+    # Re-emitted on every rerun: Streamlit drops elements a rerun doesn't render
+    style_html = _custom_style_html("style.css", FONT_LINKS)
+    if style_html:
+        st.markdown(style_html, unsafe_allow_html=True)
+
+
+def load_deferred_css():
+    """
+    Load the LTS theme CSS for tab content (tables, charts, expanders).
+    
+    Call at the end of the script so these rules don't hold up the first paint.
+    """
+    style_html = _custom_style_html("style_deferred.css")
+    if style_html:
+        st.markdown(style_html, unsafe_allow_html=True)
 
 
 def render_page_header(title: str, subtitle: str = "", icon: str = ""):
@@ -174,26 +260,8 @@ def render_status_badge(
     """
     status_lower = status.lower()
     
-    style_map = {
-        "high": {"bg": "#C62828", "text": "#FFFFFF"},
-        "hoch": {"bg": "#C62828", "text": "#FFFFFF"},
-        "medium": {"bg": "#F9A825", "text": "#333333"},
-        "mittel": {"bg": "#F9A825", "text": "#333333"},
-        "low": {"bg": "#2E7D32", "text": "#FFFFFF"},
-        "niedrig": {"bg": "#2E7D32", "text": "#FFFFFF"},
-        "success": {"bg": "#2E7D32", "text": "#FFFFFF"},
-        "warning": {"bg": "#F9A825", "text": "#333333"},
-        "error": {"bg": "#C62828", "text": "#FFFFFF"},
-    }
-    
-    size_map = {
-        "small": "0.2rem 0.5rem; font-size: 0.7rem",
-        "normal": "0.3rem 0.75rem; font-size: 0.8rem",
-        "large": "0.4rem 1rem; font-size: 0.9rem"
-    }
-    
-    style = style_map.get(status_lower, {"bg": "#718096", "text": "#FFFFFF"})
-    padding = size_map.get(size, size_map["normal"])
+    style = STATUS_BADGE_STYLES.get(status_lower, {"bg": "#718096", "text": "#FFFFFF"})
+    padding = STATUS_BADGE_SIZES.get(size, STATUS_BADGE_SIZES["normal"])
     
     return f"""
     <span style="
@@ -252,7 +320,7 @@ def render_action_card(
     
     actions_html = ""
     if action_items:
-        items = "".join([f"<li style='margin: 0.25rem 0;'>{item}</li>" for item in action_items])
+        items = "".join([ACTION_ITEM_TEMPLATE.format(item=item) for item in action_items])
         actions_html = f"<ul style='margin: 0.75rem 0 0 0; padding-left: 1.5rem;'>{items}</ul>"
     
     card_html = f"""
@@ -282,15 +350,43 @@ def render_stat_row(stats: List[Dict]):
     Args:
         stats: List of dicts with 'label' and 'value' keys
     """
-    cols = st.columns(len(stats))
-    for i, stat in enumerate(stats):
-        with cols[i]:
-            st.markdown(f"""
-            <div style="text-align: center; padding: 0.5rem;">
-                <div style="font-size: 1.25rem; font-weight: 600; color: #0D47A1;">{stat.get('value', '-')}</div>
-                <div style="font-size: 0.75rem; color: #718096; text-transform: uppercase;">{stat.get('label', '')}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    items = "".join([
+        STAT_ITEM_TEMPLATE.format(value=stat.get('value', '-'), label=stat.get('label', ''))
+        for stat in stats
+    ])
+    st.markdown(f'<div style="display: flex; gap: 1rem;">{items}</div>', unsafe_allow_html=True)
+
+
+def render_bar_list(
+    items: List[Tuple[str, float]],
+    title: str = "",
+    value_format: str = "{:.2f}",
+    color: str = "#0D47A1"
+):
+    """
+    Render a short list of horizontal bars as plain HTML.
+    
+    For charts with a handful of bars this replaces a Plotly figure, whose
+    JSON spec and client-side layout cost far more than the data itself.
+    
+    Args:
+        items: (label, value) pairs, drawn top to bottom
+        title: Optional caption above the bars
+        value_format: Format applied to each value label
+        color: Bar color
+    """
+    max_value = max((value for _, value in items), default=0)
+    rows = "".join([
+        BAR_ROW_TEMPLATE.format(
+            label=html.escape(str(label)),
+            width=(value / max_value * 100) if max_value > 0 else 0,
+            color=color,
+            value=value_format.format(value)
+        )
+        for label, value in items
+    ])
+    header = f'<div style="font-weight: 600; color: #1A1A2E; margin-bottom: 0.5rem;">{title}</div>' if title else ""
+    st.markdown(f'<div>{header}{rows}</div>', unsafe_allow_html=True)
 
 
 # =============================================================================
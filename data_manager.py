@@ -10,7 +10,119 @@ from pathlib import Path
 from typing import List, Optional, Dict, Any
 import json
 import os
+import io
+import codecs
+import csv
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Cell values that mark a wide-format indicator column as set
+TRUTHY_VALUES = [1, '1', True, 'Yes', 'yes', 'TRUE']
+
+# Spellings of a positive contact_made answer (compared upper-cased)
+CONTACT_YES_VALUES = frozenset({'Y', 'YES', 'J', 'JA', '1', '1.0', 'TRUE'})
+
+# Upload bookkeeping columns that only the dedup/export paths need
+BOOKKEEPING_COLUMNS = ['_row_hash', '_upload_date', '_upload_label']
+
+# Low-cardinality ID columns held as categoricals in the combined frame
+CATEGORY_COLUMNS = ['_depot_id', 'transporter_id', 'zip_code']
+
+# Money columns held as float32 in the combined frame (cents need ~7 digits)
+FLOAT32_COLUMNS = ['concession_cost']
+
+# Columns that identify a delivery for upload deduplication
+ROW_HASH_KEY_COLUMNS = ['transporter_id', 'delivery_date_time', 'tracking_id']
+
+# Most depot files read concurrently when combining depots
+MAX_READ_THREADS = 4
+
+# Encodings tried, in order, for uploaded CSVs (latin-1 accepts any byte)
+CSV_ENCODINGS = ['utf-8-sig', 'cp1252', 'latin-1']
+CSV_SNIFF_BYTES = 64 * 1024
+
+# Delimiters considered when sniffing uploaded CSVs (Excel exports often use ';')
+CSV_DELIMITERS = ',;\t|'
+CSV_SNIFF_LINES = 20
+
+# Wide-format concession indicator columns -> concession_type value (priority order)
+CONCESSION_COLUMN_MAP = {
+    'delivered to neighbour': 'neighbor',
+    'delivered to household member / customer': 'household_member',
+    'delivered to mailslot': 'mailbox',
+    'delivered to receptionist': 'receptionist',
+    'delivery preferences not followed': 'prefs_not_followed',
+    'unattended delivery & no photo on delivery': 'unattended_no_photo',
+    'mailbox eligible, delivered elsewhere': 'mailbox_eligible_elsewhere',
+}
+
+# Wide-format pattern indicator columns -> boolean feature column
+PATTERN_COLUMNS = {
+    'geo distance > 25m': 'geo_anomaly',
+    'simultaneous group stops': 'group_stop',
+    'multiple concessions reasons': 'multi_concession',
+    'no photo on delivery': 'no_photo',
+    'photo on delivery': 'has_photo',
+    'high value item': 'high_value',
+    'signature on delivery': 'has_signature',
+    'delivered using otp': 'otp_delivery',
+    'successful contact opportunity': 'contact_success',
+    'unsuccessful contact opportunity': 'contact_fail',
+}
+
+# Raw column aliases -> internal column names
+COLUMN_MAPPINGS = {
+    # Transporter/Driver identification (internal: transporter_id)
+    'driver': 'transporter_id',
+    'driver_id': 'transporter_id',
+    'driverid': 'transporter_id',
+    'driver_name': 'transporter_id',
+    'fahrer': 'transporter_id',
+    'fahrer_id': 'transporter_id',
+    'transporter': 'transporter_id',
+    
+    # Tracking/Package identification
+    'tracking': 'tracking_id',
+    'trackingid': 'tracking_id',
+    'tracking_number': 'tracking_id',
+    'package_id': 'tracking_id',
+    'shipment_id': 'tracking_id',
+    'sendungsnummer': 'tracking_id',
+    
+    # Address identification (for customer abuse detection)
+    'address': 'address_id',
+    'addressid': 'address_id',
+    'address_hash': 'address_id',
+    'customer_id': 'address_id',
+    'recipient_id': 'address_id',
+    'empfänger_id': 'address_id',
+    'adresse_id': 'address_id',
+    
+    # Date/time
+    'date': 'delivery_date_time',
+    'datetime': 'delivery_date_time',
+    'delivery_date': 'delivery_date_time',
+    'dnr_date': 'delivery_date_time',
+    'zustelldatum': 'delivery_date_time',
+    'lieferdatum': 'delivery_date_time',
+    
+    # Concession info
+    'concession': 'concession_type',
+    'type': 'concession_type',
+    'dnr_type': 'concession_type',
+    'concession_reason': 'concession_type',
+    'grund': 'concession_type',
+    'shipment_reason': 'concession_type',  # Added for weekly data
+    
+    # Cost
+    'cost': 'concession_cost',
+    'kosten': 'concession_cost',
+    
+    # Contact
+    'contact': 'contact_made',
+    'kontakt': 'contact_made',
+}
 
 
 class DataManager:
@@ -103,7 +215,7 @@ class DataManager:
         df['_upload_label'] = upload_label or f"Upload {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         
         # Create unique row ID for deduplication
-        df['_row_hash'] = df.apply(self._create_row_hash, axis=1)
+        df['_row_hash'] = self._create_row_hashes(df)
         
         # Load existing data
         existing_df = self.get_depot_data(depot_id)
@@ -157,7 +269,8 @@ class DataManager:
         data_file = self.depots_dir / depot_id / "deliveries.parquet"
         
         if data_file.exists():
-            return pd.read_parquet(data_file)
+            with arrow_strings():
+                return pd.read_parquet(data_file)
         return pd.DataFrame()
     
     def get_all_data(self, depots: List[str] = None) -> pd.DataFrame:
@@ -170,23 +283,52 @@ class DataManager:
         if depots is None:
             depots = self.get_depots()
         
-        dfs = []
-        for depot_id in depots:
-            df = self.get_depot_data(depot_id)
-            if not df.empty:
-                dfs.append(df)
+        import pyarrow.parquet as pq
+        
+        def read_depot(data_file: Path) -> pd.DataFrame:
+            # Skip the bookkeeping columns at read time; the per-row hash strings
+            # are the widest column in the file and analysis never looks at them
+            columns = [c for c in pq.read_schema(data_file).names if c not in BOOKKEEPING_COLUMNS]
+            return pd.read_parquet(data_file, columns=columns)
+        
+        data_files = [self.depots_dir / depot_id / "deliveries.parquet" for depot_id in depots]
+        data_files = [f for f in data_files if f.exists()]
+        
+        # Parquet decoding releases the GIL, so depot files are read in parallel
+        # threads (in depot order). The string option is set once, around all
+        # reads, since pandas options are process-wide.
+        with arrow_strings():
+            if len(data_files) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(data_files), MAX_READ_THREADS)) as pool:
+                    frames = list(pool.map(read_depot, data_files))
+            else:
+                frames = [read_depot(f) for f in data_files]
+        dfs = [df for df in frames if not df.empty]
         
         if dfs:
-            return pd.concat(dfs, ignore_index=True)
+            combined = pd.concat(dfs, ignore_index=True)
+            return narrow_float_columns(categorize_id_columns(combined))
         return pd.DataFrame()
     
+    def get_data_version(self, depots: List[str]) -> tuple:
+        """
+        Modification times of the depots' data files.
+        
+        Changes whenever data is uploaded or deleted, so callers can use it
+        as a cache key for anything derived from get_all_data.
+        """
+        version = []
+        for depot_id in depots:
+            data_file = self.depots_dir / depot_id / "deliveries.parquet"
+            version.append(data_file.stat().st_mtime_ns if data_file.exists() else None)
+        return tuple(version)
+    
     def get_depot_summary(self, depot_id: str) -> Dict[str, Any]:
         """Get summary statistics for a depot"""
         if depot_id not in self.metadata["depots"]:
             return {}
         
         depot_meta = self.metadata["depots"][depot_id]
-        df = self.get_depot_data(depot_id)
         
         summary = {
             "depot_id": depot_id,
@@ -197,14 +339,51 @@ class DataManager:
             "last_upload": depot_meta.get("uploads", [{}])[-1] if depot_meta.get("uploads") else None,
         }
         
-        if not df.empty:
-            summary["transporter_count"] = df['transporter_id'].nunique() if 'transporter_id' in df.columns else 0
-            summary["concession_rate"] = (
-                df['concession_type'].notna().sum() / len(df) * 100
-            ) if 'concession_type' in df.columns else 0
+        data_file = self.depots_dir / depot_id / "deliveries.parquet"
+        if data_file.exists():
+            summary.update(self._stream_depot_stats(data_file))
         
         return summary
     
+    def _stream_depot_stats(self, data_file: Path, batch_size: int = 250_000) -> Dict[str, Any]:
+        """
+        Compute driver count and concession rate by streaming record batches.
+        
+        Only the two needed columns are read and counters are accumulated per
+        batch, so the summary never materializes the full depot file.
+        
+        Args:
+            data_file: Path to a depot parquet file
+            batch_size: Rows per record batch
+            
+        Returns:
+            Dict with transporter_count and concession_rate (empty if no rows)
+        """
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(data_file)
+        total_rows = parquet_file.metadata.num_rows
+        if total_rows == 0:
+            return {}
+        
+        available = set(parquet_file.schema_arrow.names)
+        columns = [c for c in ('transporter_id', 'concession_type') if c in available]
+        
+        transporters = set()
+        concessions = 0
+        if columns:
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                chunk = batch.to_pandas()
+                if 'transporter_id' in chunk.columns:
+                    transporters.update(chunk['transporter_id'].dropna().unique())
+                if 'concession_type' in chunk.columns:
+                    concessions += int(chunk['concession_type'].notna().sum())
+        
+        return {
+            "transporter_count": len(transporters) if 'transporter_id' in available else 0,
+            "concession_rate": concessions / total_rows * 100 if 'concession_type' in available else 0,
+        }
+    
     def delete_depot_data(self, depot_id: str, confirm: bool = False):
         """Delete all data for a depot"""
         if not confirm:
@@ -322,31 +501,17 @@ class DataManager:
         # Lowercase columns for matching
         df.columns = df.columns.str.lower().str.strip()
         
-        # Define wide-format concession columns -> concession_type values
-        concession_col_map = {
-            'delivered to neighbour': 'neighbor',
-            'delivered to household member / customer': 'household_member',
-            'delivered to mailslot': 'mailbox',
-            'delivered to receptionist': 'receptionist',
-            'delivery preferences not followed': 'prefs_not_followed',
-            'unattended delivery & no photo on delivery': 'unattended_no_photo',
-            'mailbox eligible, delivered elsewhere': 'mailbox_eligible_elsewhere',
-        }
-        
         # Check if this is wide-format data (has binary concession columns)
-        matched_cols = [c for c in concession_col_map.keys() if c in df.columns]
+        matched_cols = [c for c in CONCESSION_COLUMN_MAP.keys() if c in df.columns]
         
         if matched_cols and 'concession_type' not in df.columns:
             # This is wide-format data - need to normalize
             
-            # Determine concession_type from binary columns (first match wins, priority order)
-            def determine_concession_type(row):
-                for col, ctype in concession_col_map.items():
-                    if col in row.index and row.get(col) in [1, '1', True, 'Yes', 'yes', 'TRUE']:
-                        return ctype
-                return None
-            
-            df['concession_type'] = df.apply(determine_concession_type, axis=1)
+            # Determine concession_type from binary columns (first match wins, priority order).
+            # One boolean column per matched flag; argmax picks the first set flag per row.
+            flags = df[matched_cols].isin(TRUTHY_VALUES).to_numpy()
+            ctypes = np.array([CONCESSION_COLUMN_MAP[col] for col in matched_cols], dtype=object)
+            df['concession_type'] = np.where(flags.any(axis=1), ctypes[flags.argmax(axis=1)], None)
             
             # Map 'concession cost' column
             if 'concession cost' in df.columns:
@@ -361,24 +526,12 @@ class DataManager:
             # else: leave address_id missing, abuse detection will fallback to tracking_id
         
         # Extract additional pattern-recognition features from wide-format
-        pattern_cols = {
-            'geo distance > 25m': 'geo_anomaly',
-            'simultaneous group stops': 'group_stop',
-            'multiple concessions reasons': 'multi_concession',
-            'no photo on delivery': 'no_photo',
-            'photo on delivery': 'has_photo',
-            'high value item': 'high_value',
-            'signature on delivery': 'has_signature',
-            'delivered using otp': 'otp_delivery',
-            'successful contact opportunity': 'contact_success',
-            'unsuccessful contact opportunity': 'contact_fail',
-        }
-        
-        for old_col, new_col in pattern_cols.items():
-            if old_col in df.columns and new_col not in df.columns:
-                df[new_col] = df[old_col].apply(
-                    lambda x: True if x in [1, '1', True, 'Yes', 'yes', 'TRUE'] else False
-                )
+        # One frame-level membership test (hash lookup in C) over every present flag column
+        present = {old: new for old, new in PATTERN_COLUMNS.items()
+                   if old in df.columns and new not in df.columns}
+        if present:
+            flags = df[list(present)].isin(TRUTHY_VALUES).rename(columns=present)
+            df = pd.concat([df, flags], axis=1)
         
         return df
     
@@ -392,73 +545,61 @@ class DataManager:
         # Lowercase column names
         df.columns = df.columns.str.lower().str.strip()
         
-        # Common column mappings
-        mappings = {
-            # Transporter/Driver identification (internal: transporter_id)
-            'driver': 'transporter_id',
-            'driver_id': 'transporter_id',
-            'driverid': 'transporter_id',
-            'driver_name': 'transporter_id',
-            'fahrer': 'transporter_id',
-            'fahrer_id': 'transporter_id',
-            'transporter': 'transporter_id',
-            
-            # Tracking/Package identification
-            'tracking': 'tracking_id',
-            'trackingid': 'tracking_id',
-            'tracking_number': 'tracking_id',
-            'package_id': 'tracking_id',
-            'shipment_id': 'tracking_id',
-            'sendungsnummer': 'tracking_id',
-            
-            # Address identification (for customer abuse detection)
-            'address': 'address_id',
-            'addressid': 'address_id',
-            'address_hash': 'address_id',
-            'customer_id': 'address_id',
-            'recipient_id': 'address_id',
-            'empfänger_id': 'address_id',
-            'adresse_id': 'address_id',
-            
-            # Date/time
-            'date': 'delivery_date_time',
-            'datetime': 'delivery_date_time',
-            'delivery_date': 'delivery_date_time',
-            'dnr_date': 'delivery_date_time',
-            'zustelldatum': 'delivery_date_time',
-            'lieferdatum': 'delivery_date_time',
-            
-            # Concession info
-            'concession': 'concession_type',
-            'type': 'concession_type',
-            'dnr_type': 'concession_type',
-            'concession_reason': 'concession_type',
-            'grund': 'concession_type',
-            'shipment_reason': 'concession_type',  # Added for weekly data
-            
-            # Cost
-            'cost': 'concession_cost',
-            'kosten': 'concession_cost',
-            
-            # Contact
-            'contact': 'contact_made',
-            'kontakt': 'contact_made',
-        }
-        
-        for old, new in mappings.items():
-            if old in df.columns and new not in df.columns:
-                df = df.rename(columns={old: new})
+        # Common column mappings - the first alias present wins for each target,
+        # applied in a single rename instead of one frame copy per alias
+        renames = {}
+        targets = set(df.columns)
+        for old, new in COLUMN_MAPPINGS.items():
+            if old in targets and new not in targets:
+                renames[old] = new
+                targets.add(new)
+        if renames:
+            df = df.rename(columns=renames)
         
         # Parse dates
         if 'delivery_date_time' in df.columns:
             df['delivery_date_time'] = pd.to_datetime(df['delivery_date_time'], errors='coerce')
         
+        # Y/N style contact answers -> bool (one vectorized string pass, no per-cell lambda)
+        if 'contact_made' in df.columns and not pd.api.types.is_bool_dtype(df['contact_made']):
+            df['contact_made'] = (
+                df['contact_made'].astype(str).str.strip().str.upper().isin(CONTACT_YES_VALUES)
+            )
+        
         return df
     
+    def _create_row_hashes(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Create the deduplication hash for every row.
+        
+        Produces exactly the hashes of _create_row_hash, but reads the key
+        columns column-wise instead of building a Series per row.
+        """
+        key_cols = [c for c in ROW_HASH_KEY_COLUMNS if c in df.columns]
+        if not key_cols:
+            return df.apply(self._create_row_hash, axis=1)
+        
+        # Object arrays box values the same way row-wise apply does (Timestamp,
+        # Python int/float/str), so str() of the key list is unchanged
+        values = zip(*(df[c].to_numpy(dtype=object) for c in key_cols))
+        present = zip(*(df[c].notna().to_numpy() for c in key_cols))
+        
+        hashes = []
+        for row_values, row_present in zip(values, present):
+            key = [v for v, ok in zip(row_values, row_present) if ok]
+            hashes.append(hashlib.md5(str(key).encode()).hexdigest() if key else None)
+        hashes = pd.Series(hashes, index=df.index, dtype=object)
+        
+        # Rows without any key value hash the whole row, as before
+        keyless = hashes.isna()
+        if keyless.any():
+            hashes[keyless] = df[keyless].apply(self._create_row_hash, axis=1)
+        return hashes
+    
     def _create_row_hash(self, row) -> str:
         """Create unique hash for a row (for deduplication)"""
         # Use key columns for uniqueness
-        key_cols = ['transporter_id', 'delivery_date_time', 'tracking_id']
+        key_cols = ROW_HASH_KEY_COLUMNS
         available_cols = [c for c in key_cols if c in row.index and pd.notna(row.get(c))]
         
         if not available_cols:
@@ -470,6 +611,120 @@ class DataManager:
         return hashlib.md5(values.encode()).hexdigest()
 
 
+# =============================================================================
+# CACHE KEYS
+# =============================================================================
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame, for use as an explicit cache key.
+    
+    Computed once per rerun and passed to cached functions next to the frame
+    itself (as an underscore argument Streamlit does not hash), so several
+    caches keyed on the same data share a single hashing pass.
+    """
+    digest = hashlib.md5()
+    digest.update(repr((df.shape, list(df.columns), [str(t) for t in df.dtypes])).encode())
+    digest.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+    for i in range(df.shape[1]):
+        values = df.iloc[:, i]
+        try:
+            hashed = pd.util.hash_pandas_object(values, index=False)
+        except TypeError:
+            # Unhashable objects (e.g. lists); fall back to their string form
+            hashed = pd.util.hash_pandas_object(values.astype(str), index=False)
+        digest.update(hashed.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# =============================================================================
+# FILE READING
+# =============================================================================
+
+def arrow_strings():
+    """
+    Context in which readers return text columns as Arrow-backed str dtype.
+    
+    That is the default from pandas 3; on pandas 2.x it avoids one Python
+    object per cell. Unlike dtype_backend='pyarrow' it leaves numeric, bool
+    and datetime columns (and NaN missing-value semantics) unchanged.
+    """
+    return pd.option_context('future.infer_string', True)
+
+
+def categorize_id_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the CATEGORY_COLUMNS present in df to categoricals, in place.
+    
+    A handful of depot/driver IDs repeated on every row: integer codes are
+    smaller and let the per-driver groupbys skip string hashing.
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def narrow_float_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the FLOAT32_COLUMNS present in df to float32, in place.
+    
+    Halves their memory and the bytes of any table they are shown in; totals
+    over them should be accumulated in float64.
+    """
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype('float32')
+    return df
+
+
+def detect_csv_encoding(sample: bytes) -> str:
+    """Pick the first of CSV_ENCODINGS that decodes a byte sample cleanly"""
+    for encoding in CSV_ENCODINGS:
+        try:
+            # Incremental decode so a multi-byte character cut off at the end
+            # of the sample doesn't count as a failure
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CSV_ENCODINGS[-1]
+
+
+def detect_csv_delimiter(sample: str) -> str:
+    """Sniff the delimiter from the first lines of a CSV, defaulting to ','"""
+    head = '\n'.join(sample.splitlines()[:CSV_SNIFF_LINES])
+    try:
+        return csv.Sniffer().sniff(head, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+
+def read_uploaded_file(file_bytes: bytes, file_name: str) -> pd.DataFrame:
+    """
+    Parse an uploaded CSV or Excel file.
+    
+    The CSV encoding and delimiter are detected once from a small prefix, so
+    the file is parsed a single time by pandas' C parser regardless of how it
+    was encoded or separated. Text columns are read as Arrow-backed strings.
+    """
+    buffer = io.BytesIO(file_bytes)
+    with arrow_strings():
+        if file_name.lower().endswith('.csv'):
+            prefix = file_bytes[:CSV_SNIFF_BYTES]
+            encoding = detect_csv_encoding(prefix)
+            sep = detect_csv_delimiter(
+                codecs.getincrementaldecoder(encoding)(errors='ignore').decode(prefix, final=False)
+            )
+            try:
+                return pd.read_csv(buffer, sep=sep, encoding=encoding, engine='c')
+            except UnicodeDecodeError:
+                # The prefix decoded but a later byte did not
+                buffer.seek(0)
+                return pd.read_csv(buffer, sep=sep, encoding=CSV_ENCODINGS[-1], engine='c')
+        return pd.read_excel(buffer)
+
+
 # =============================================================================
 # STREAMLIT UI COMPONENTS FOR DATA MANAGEMENT
 # =============================================================================
@@ -484,7 +739,8 @@ def render_data_management_sidebar(data_manager: DataManager):
     depots = data_manager.get_depots()
     
     if depots:
-        # Always visible depot list with stats
+        # Always visible depot list with stats, emitted as one markdown block
+        depot_cards = []
         for depot_id in depots:
             summary = data_manager.get_depot_summary(depot_id)
             depot_name = summary.get('name', depot_id)
@@ -492,7 +748,7 @@ def render_data_management_sidebar(data_manager: DataManager):
             rate = summary.get('concession_rate', 0)
             
             # Depot card - always visible
-            st.sidebar.markdown(f"""
+            depot_cards.append(f"""
             <div style="
                 background: linear-gradient(135deg, #E3F2FD 0%, #BBDEFB 100%);
                 border-left: 4px solid #0D47A1;
@@ -508,7 +764,8 @@ def render_data_management_sidebar(data_manager: DataManager):
                     <span>📈 {rate:.1f}%</span>
                 </div>
             </div>
-            """, unsafe_allow_html=True)
+            """)
+        st.sidebar.markdown("".join(depot_cards), unsafe_allow_html=True)
         
         st.sidebar.divider()
         
@@ -631,15 +888,21 @@ def render_data_upload_tab(data_manager: DataManager):
             help="Upload your raw delivery/concession data"
         )
     
-    if uploaded_file is not None:
+    if uploaded_file is None:
+        # Release the parsed frame of a removed file
+        st.session_state.pop('upload_tab_file', None)
+    else:
         # Preview data
         st.subheader("📋 Data Preview")
         
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            # Parsed once per uploaded file and kept in the session, so reruns from
+            # the depot/label widgets and the upload button reuse the same frame
+            cached = st.session_state.get('upload_tab_file')
+            if cached is None or cached[0] != uploaded_file.file_id:
+                cached = (uploaded_file.file_id, read_uploaded_file(uploaded_file.getvalue(), uploaded_file.name))
+                st.session_state['upload_tab_file'] = cached
+            df = cached[1]
             
             st.write(f"**Rows:** {len(df):,} | **Columns:** {len(df.columns)}")
             st.dataframe(df.head(10), use_container_width=True)
@@ -648,13 +911,14 @@ def render_data_upload_tab(data_manager: DataManager):
             st.subheader("🔍 Column Detection")
             
             expected_cols = ['transporter_id', 'delivery_date_time', 'concession_type', 'tracking_id']
-            df_cols_lower = [c.lower().strip() for c in df.columns]
+            # Lowercase the column index once; each check is then a single vectorized find
+            df_cols_lower = df.columns.astype(str).str.lower().str.strip()
             
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown("**Expected Columns:**")
                 for col in expected_cols:
-                    if col in df_cols_lower or any(col in c for c in df_cols_lower):
+                    if (df_cols_lower.str.find(col) >= 0).any():
                         st.markdown(f"✅ {col}")
                     else:
                         st.markdown(f"⚠️ {col} (may be mapped automatically)")
@@ -670,13 +934,6 @@ def render_data_upload_tab(data_manager: DataManager):
             
             if st.button("📤 Upload Data to Depot", type="primary"):
                 with st.spinner("Uploading and processing data..."):
-                    # Reset file pointer
-                    uploaded_file.seek(0)
-                    if uploaded_file.name.endswith('.csv'):
-                        df = pd.read_csv(uploaded_file)
-                    else:
-                        df = pd.read_excel(uploaded_file)
-                    
                     result = data_manager.upload_data(
                         depot_id=selected_depot,
                         df=df,
@@ -719,11 +976,50 @@ def render_data_upload_tab(data_manager: DataManager):
         st.info("No uploads yet. Upload data above to get started.")
 
 
+def summarize_depot_comparison(all_data: pd.DataFrame) -> tuple:
+    """
+    Per-depot and per-depot-week concession counts for the depot comparison.
+    
+    Concessions are counted with a grouped sum over a local flag Series instead
+    of a Python lambda per group; all_data is not modified.
+    
+    Returns:
+        (depot_stats with Depot, Drivers, Concessions, Total Deliveries and
+        Concession Rate columns, weekly with Depot, Week, Concessions,
+        Deliveries and Rate columns)
+    """
+    if 'concession_type' in all_data.columns:
+        is_concession = all_data['concession_type'].notna()
+    else:
+        is_concession = pd.Series(False, index=all_data.index)
+    depots = all_data['_depot_id']
+    
+    by_depot = is_concession.groupby(depots, observed=True)
+    depot_stats = pd.DataFrame({
+        'Drivers': all_data['transporter_id'].groupby(depots, observed=True).nunique(),
+        'Concessions': by_depot.sum(),
+        'Total Deliveries': by_depot.size()
+    }).rename_axis('Depot').reset_index()
+    depot_stats['Concession Rate'] = (depot_stats['Concessions'] / depot_stats['Total Deliveries'] * 100).round(2)
+    
+    dates = pd.to_datetime(all_data['delivery_date_time'])
+    year_week = (
+        dates.dt.year.astype(str) + '-W' + dates.dt.isocalendar().week.astype(str).str.zfill(2)
+    ).rename('Week')
+    by_week = is_concession.groupby([depots.rename('Depot'), year_week], observed=True)
+    weekly = pd.DataFrame({
+        'Concessions': by_week.sum(),
+        'Deliveries': by_week.size()
+    }).reset_index()
+    weekly['Rate'] = weekly['Concessions'] / weekly['Deliveries'] * 100
+    
+    return depot_stats, weekly
+
+
 def render_depot_comparison(data_manager: DataManager, features_df: pd.DataFrame):
     """Render depot comparison view"""
     import streamlit as st
     import plotly.express as px
-    import plotly.graph_objects as go
     
     st.subheader("🏭 Depot Comparison")
     
@@ -740,14 +1036,7 @@ def render_depot_comparison(data_manager: DataManager, features_df: pd.DataFrame
         st.warning("No data uploaded yet.")
         return
     
-    # Summary by depot
-    depot_stats = all_data.groupby('_depot_id').agg({
-        'driver_id': 'nunique',
-        'concession_type': lambda x: x.notna().sum(),
-        '_depot_id': 'count'
-    }).reset_index()
-    depot_stats.columns = ['Depot', 'Drivers', 'Concessions', 'Total Deliveries']
-    depot_stats['Concession Rate'] = (depot_stats['Concessions'] / depot_stats['Total Deliveries'] * 100).round(2)
+    depot_stats, weekly = summarize_depot_comparison(all_data)
     
     # Display metrics
     cols = st.columns(len(depots))
@@ -778,17 +1067,6 @@ def render_depot_comparison(data_manager: DataManager, features_df: pd.DataFrame
     # Trend comparison
     st.subheader("📈 Weekly Trends by Depot")
     
-    all_data['week'] = pd.to_datetime(all_data['delivery_date_time']).dt.isocalendar().week
-    all_data['year'] = pd.to_datetime(all_data['delivery_date_time']).dt.year
-    all_data['year_week'] = all_data['year'].astype(str) + '-W' + all_data['week'].astype(str).str.zfill(2)
-    
-    weekly = all_data.groupby(['_depot_id', 'year_week']).agg({
-        'concession_type': lambda x: x.notna().sum(),
-        'driver_id': 'count'
-    }).reset_index()
-    weekly.columns = ['Depot', 'Week', 'Concessions', 'Deliveries']
-    weekly['Rate'] = weekly['Concessions'] / weekly['Deliveries'] * 100
-    
     fig = px.line(
         weekly,
         x='Week',
@@ -1,6 +1,18 @@
 """ML Engine Package"""
-from .feature_engineering import FeatureEngineer
-from .risk_model import DriverRiskModel
-from .pattern_recognition import PatternAnalyzer
+import importlib
+
+# Submodule providing each exported name, imported on first access so that
+# e.g. feature engineering doesn't load XGBoost via this package
+_EXPORTS = {
+    "FeatureEngineer": ".feature_engineering",
+    "DriverRiskModel": ".risk_model",
+    "PatternAnalyzer": ".pattern_recognition",
+}
 
 __all__ = ["FeatureEngineer", "DriverRiskModel", "PatternAnalyzer"]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
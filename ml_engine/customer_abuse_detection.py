@@ -14,6 +14,21 @@ import sys
 sys.path.append('..')
 from config import column_config
 
+# Input columns the analysis reads (after lower-casing); everything else an
+# upload carries is left out of the working copy
+ANALYSIS_COLUMNS = [
+    'transporter_id', 'tracking_id', 'address_id', 'delivery_date_time',
+    'concession_type', 'date', 'hour', 'dayofweek',
+]
+
+# Table icon per pattern severity
+SEVERITY_ICONS = {
+    "critical": "🔴",
+    "high": "🟠",
+    "medium": "🟡",
+    "low": "🟢"
+}
+
 
 @dataclass
 class AbusePattern:
@@ -122,10 +137,11 @@ class CustomerAbuseDetector:
     
     def _prepare_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Prepare data for analysis"""
-        df = df.copy()
-        
-        # Standardize column names
-        df.columns = df.columns.str.lower().str.strip()
+        # Standardize column names and copy only the columns the analysis uses
+        columns = df.columns.str.lower().str.strip()
+        used = columns.isin(ANALYSIS_COLUMNS)
+        df = df.loc[:, used].copy()
+        df.columns = columns[used]
         
         # Ensure required columns
         if 'tracking_id' not in df.columns:
@@ -160,6 +176,18 @@ class CustomerAbuseDetector:
         if len(addr_df) == 0:
             return results
         
+        # Concession type counts for every address in one grouped value_counts,
+        # instead of one value_counts call per address inside the loop
+        types_by_address = {}
+        if 'concession_type' in addr_df.columns:
+            type_counts = (
+                addr_df[addr_df['is_concession']]
+                .groupby('address_id')['concession_type']
+                .value_counts()
+            )
+            for (address_id, ctype), count in type_counts.items():
+                types_by_address.setdefault(address_id, {})[ctype] = count
+        
         # Group by address
         address_groups = addr_df.groupby('address_id')
         
@@ -167,16 +195,17 @@ class CustomerAbuseDetector:
             if len(group) < self.min_deliveries_for_analysis:
                 continue
             
-            # Calculate metrics
+            # Calculate metrics (subsets and date bounds are reused by every pattern check)
             total = len(group)
             concessions = group['is_concession'].sum()
             rate = concessions / total
             unique_drivers = group['transporter_id'].nunique()
+            concession_group = group[group['is_concession']]
+            first_seen = group['delivery_date_time'].min()
+            last_seen = group['delivery_date_time'].max()
             
             # Build profile
-            concession_types = {}
-            if 'concession_type' in group.columns:
-                concession_types = group[group['is_concession']]['concession_type'].value_counts().to_dict()
+            concession_types = types_by_address.get(address_id, {})
             
             profile = AddressProfile(
                 address_id=str(address_id),
@@ -185,8 +214,8 @@ class CustomerAbuseDetector:
                 concession_rate=rate,
                 unique_drivers=unique_drivers,
                 concession_types=concession_types,
-                first_seen=group['delivery_date_time'].min(),
-                last_seen=group['delivery_date_time'].max(),
+                first_seen=first_seen,
+                last_seen=last_seen,
                 is_suspicious=rate >= self.high_concession_threshold,
                 abuse_score=self._calculate_abuse_score(rate, concessions, unique_drivers, concession_types),
                 patterns=[]
@@ -208,8 +237,8 @@ class CustomerAbuseDetector:
                     description=f"Adresse mit {rate*100:.0f}% Concession-Rate ({concessions}/{total} Lieferungen)",
                     concession_count=int(concessions),
                     unique_incidents=int(concessions),
-                    drivers_involved=group[group['is_concession']]['transporter_id'].unique().tolist(),
-                    date_range=(group['delivery_date_time'].min(), group['delivery_date_time'].max()),
+                    drivers_involved=concession_group['transporter_id'].unique().tolist(),
+                    date_range=(first_seen, last_seen),
                     details={
                         "concession_rate": rate,
                         "concession_types": concession_types,
@@ -226,7 +255,7 @@ class CustomerAbuseDetector:
             
             # Pattern 2: Multi-driver concessions (same address, different drivers = suspicious)
             if unique_drivers >= self.multi_driver_threshold and concessions >= 3:
-                drivers_with_concessions = group[group['is_concession']]['transporter_id'].unique()
+                drivers_with_concessions = concession_group['transporter_id'].unique()
                 if len(drivers_with_concessions) >= 2:
                     pattern = AbusePattern(
                         pattern_id=f"MULTI_DRIVER_{address_id}",
@@ -238,7 +267,7 @@ class CustomerAbuseDetector:
                         concession_count=int(concessions),
                         unique_incidents=len(drivers_with_concessions),
                         drivers_involved=list(drivers_with_concessions),
-                        date_range=(group['delivery_date_time'].min(), group['delivery_date_time'].max()),
+                        date_range=(first_seen, last_seen),
                         details={
                             "drivers_with_concessions": list(drivers_with_concessions),
                             "all_drivers": group['transporter_id'].unique().tolist()
@@ -253,7 +282,7 @@ class CustomerAbuseDetector:
                     patterns_found.append("multi_driver")
             
             # Pattern 3: Repeat concessions in short window
-            concession_rows = group[group['is_concession']].sort_values('delivery_date_time')
+            concession_rows = concession_group.sort_values('delivery_date_time')
             if len(concession_rows) >= 3:
                 dates = concession_rows['delivery_date_time'].dt.date.tolist()
                 if len(set(dates)) < len(dates):  # Same-day repeats
@@ -301,38 +330,53 @@ class CustomerAbuseDetector:
         # Extract tracking prefix (first 8-10 chars often contain location info)
         df['tracking_prefix'] = df['tracking_id'].astype(str).str[:10]
         
-        prefix_groups = df.groupby('tracking_prefix')
+        # Per-prefix counts and date range in one aggregation; only the few
+        # prefixes that pass the thresholds are turned into patterns
+        stats = df.groupby('tracking_prefix').agg(
+            total=('is_concession', 'size'),
+            concessions=('is_concession', 'sum'),
+            first_date=('delivery_date_time', 'min'),
+            last_date=('delivery_date_time', 'max'),
+        )
+        stats = stats[stats['total'] >= 5]  # Need enough samples
+        rates = stats['concessions'] / stats['total']
+        flagged = stats[(rates >= self.high_concession_threshold) & (stats['concessions'] >= 3)]
+        if flagged.empty:
+            return results
         
-        for prefix, group in prefix_groups:
-            if len(group) < 5:  # Need enough samples
-                continue
-            
-            concessions = group['is_concession'].sum()
-            rate = concessions / len(group)
-            
-            if rate >= self.high_concession_threshold and concessions >= 3:
-                pattern = AbusePattern(
-                    pattern_id=f"TRACKING_{prefix}",
-                    address_id=None,
-                    pattern_type="tracking_pattern",
-                    severity="medium",
-                    confidence=min(rate * 0.8, 0.9),  # Lower confidence without address
-                    description=f"Tracking-Muster {prefix}... zeigt {rate*100:.0f}% Concession-Rate",
-                    concession_count=int(concessions),
-                    unique_incidents=int(concessions),
-                    drivers_involved=group[group['is_concession']]['transporter_id'].unique().tolist(),
-                    date_range=(group['delivery_date_time'].min(), group['delivery_date_time'].max()),
-                    details={
-                        "tracking_prefix": prefix,
-                        "total_deliveries": len(group),
-                        "concession_rate": rate
-                    },
-                    recommendations=[
-                        "Tracking-Muster auf gemeinsame Adresse prüfen",
-                        "Route analysieren"
-                    ]
-                )
-                results["patterns"].append(pattern)
+        concession_rows = df[df['is_concession'] & df['tracking_prefix'].isin(flagged.index)]
+        drivers_by_prefix = concession_rows.groupby('tracking_prefix')['transporter_id'].unique()
+        
+        for prefix, total, concessions, first_date, last_date in zip(
+            flagged.index,
+            flagged['total'].to_numpy(),
+            flagged['concessions'].to_numpy(),
+            flagged['first_date'],
+            flagged['last_date'],
+        ):
+            rate = concessions / total
+            pattern = AbusePattern(
+                pattern_id=f"TRACKING_{prefix}",
+                address_id=None,
+                pattern_type="tracking_pattern",
+                severity="medium",
+                confidence=min(rate * 0.8, 0.9),  # Lower confidence without address
+                description=f"Tracking-Muster {prefix}... zeigt {rate*100:.0f}% Concession-Rate",
+                concession_count=int(concessions),
+                unique_incidents=int(concessions),
+                drivers_involved=drivers_by_prefix[prefix].tolist(),
+                date_range=(first_date, last_date),
+                details={
+                    "tracking_prefix": prefix,
+                    "total_deliveries": int(total),
+                    "concession_rate": rate
+                },
+                recommendations=[
+                    "Tracking-Muster auf gemeinsame Adresse prüfen",
+                    "Route analysieren"
+                ]
+            )
+            results["patterns"].append(pattern)
         
         return results
     
@@ -348,13 +392,22 @@ class CustomerAbuseDetector:
         if len(addr_df) < 10:
             return patterns
         
-        # Group by address and analyze hour patterns
-        for address_id, group in addr_df.groupby('address_id'):
-            if len(group) < 3:
-                continue
+        # Peak-hour share of every address from one (address, hour) count, so
+        # only addresses that pass the thresholds are looked at individually.
+        # sort=False keeps each address's hours in first-seen order, so a stable
+        # sort of its counts reproduces value_counts() including ties
+        hour_counts = addr_df.groupby(['address_id', 'hour'], sort=False).size()
+        per_address = hour_counts.groupby(level='address_id')
+        totals = per_address.sum()
+        peak_share = per_address.max() / totals
+        flagged = peak_share.index[(totals >= 3) & (peak_share >= 0.7)]  # 70%+ at same hour
+        
+        grouped = addr_df.groupby('address_id')
+        for address_id in flagged:
+            group = grouped.get_group(address_id)
             
             # Check if concessions always happen at same hour
-            hours = group['hour'].value_counts()
+            hours = hour_counts.loc[address_id].sort_values(ascending=False, kind='stable')
             if len(hours) > 0:
                 most_common_hour = hours.index[0]
                 most_common_count = hours.values[0]
@@ -449,11 +502,16 @@ class CustomerAbuseDetector:
 # STREAMLIT UI COMPONENT
 # =============================================================================
 
-def render_abuse_detection_tab(df: pd.DataFrame):
-    """Render the customer abuse detection tab in Streamlit"""
+def render_abuse_detection_tab(df: pd.DataFrame, results: Optional[Dict[str, Any]] = None):
+    """
+    Render the customer abuse detection tab in Streamlit.
+    
+    Args:
+        df: Delivery data
+        results: Precomputed CustomerAbuseDetector.analyze output (optional,
+            analyzed here if None)
+    """
     import streamlit as st
-    import plotly.express as px
-    import plotly.graph_objects as go
     
     st.header("🚨 Kunden-Missbrauchserkennung")
     st.markdown("*Erkennung von verdächtigen Mustern - Kunden die wiederholt ungerechtfertigte Concessions auslösen*")
@@ -480,10 +538,11 @@ def render_abuse_detection_tab(df: pd.DataFrame):
     st.divider()
     
     # Run analysis
-    detector = CustomerAbuseDetector()
-    
-    with st.spinner("Analysiere Muster..."):
-        results = detector.analyze(df)
+    if results is None:
+        detector = CustomerAbuseDetector()
+        
+        with st.spinner("Analysiere Muster..."):
+            results = detector.analyze(df)
     
     # Summary metrics
     summary = results["summary"]
@@ -500,34 +559,19 @@ def render_abuse_detection_tab(df: pd.DataFrame):
     if results["patterns"]:
         st.subheader("🔍 Erkannte Muster")
         
-        for pattern in results["patterns"][:20]:  # Top 20
-            severity_icon = {
-                "critical": "🔴",
-                "high": "🟠",
-                "medium": "🟡",
-                "low": "🟢"
-            }
-            
-            with st.expander(
-                f"{severity_icon.get(pattern.severity, '⚪')} {pattern.description}", 
-                expanded=pattern.severity in ["critical", "high"]
-            ):
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.markdown(f"**Typ:** {pattern.pattern_type}")
-                    st.markdown(f"**Konfidenz:** {pattern.confidence*100:.0f}%")
-                    if pattern.address_id:
-                        st.markdown(f"**Adress-ID:** `{pattern.address_id}`")
-                
-                with col2:
-                    st.markdown(f"**Concessions:** {pattern.concession_count}")
-                    st.markdown(f"**Fahrer betroffen:** {len(pattern.drivers_involved)}")
-                
-                with col3:
-                    st.markdown("**Empfehlungen:**")
-                    for rec in pattern.recommendations:
-                        st.markdown(f"• {rec}")
+        # Top 20 as one table rather than an expander with columns per pattern
+        patterns_table = pd.DataFrame([{
+            "Schwere": f"{SEVERITY_ICONS.get(p.severity, '⚪')} {p.severity}",
+            "Beschreibung": p.description,
+            "Typ": p.pattern_type,
+            "Konfidenz": f"{p.confidence*100:.0f}%",
+            "Adress-ID": p.address_id or "N/A",
+            "Concessions": p.concession_count,
+            "Fahrer betroffen": len(p.drivers_involved),
+            "Empfehlungen": " • ".join(p.recommendations)
+        } for p in results["patterns"][:20]])
+        
+        st.dataframe(patterns_table, use_container_width=True, hide_index=True)
         
         # Export patterns
         if st.button("📥 Muster exportieren"):
@@ -557,6 +601,7 @@ def render_abuse_detection_tab(df: pd.DataFrame):
         st.divider()
         st.subheader("📍 Verdächtige Adressen (Top 15)")
         
+        top_addresses = results["suspicious_addresses"][:15]
         addr_data = [{
             "Adress-ID": a.address_id,
             "Lieferungen": a.total_deliveries,
@@ -565,19 +610,27 @@ def render_abuse_detection_tab(df: pd.DataFrame):
             "Fahrer": a.unique_drivers,
             "Abuse-Score": f"{a.abuse_score:.0f}/100",
             "Muster": ", ".join(a.patterns) if a.patterns else "-"
-        } for a in results["suspicious_addresses"][:15]]
+        } for a in top_addresses]
         
         addr_df = pd.DataFrame(addr_data)
         
-        # Highlight critical rows
-        def highlight_abuse(row):
-            if float(row['Abuse-Score'].split('/')[0]) >= 70:
-                return ['background-color: #FFCDD2'] * len(row)
-            elif float(row['Abuse-Score'].split('/')[0]) >= 50:
-                return ['background-color: #FFF9C4'] * len(row)
-            return [''] * len(row)
+        # Highlight critical rows, classified from the numeric scores (rounded
+        # like the displayed value) instead of parsing the formatted strings
+        scores = np.round([a.abuse_score for a in top_addresses])
+        row_styles = np.select(
+            [scores >= 70, scores >= 50],
+            ['background-color: #FFCDD2', 'background-color: #FFF9C4'],
+            default=''
+        )
+        
+        def highlight_abuse(frame):
+            return pd.DataFrame(
+                np.repeat(row_styles[:, None], frame.shape[1], axis=1),
+                index=frame.index,
+                columns=frame.columns
+            )
         
-        styled = addr_df.style.apply(highlight_abuse, axis=1)
+        styled = addr_df.style.apply(highlight_abuse, axis=None)
         st.dataframe(styled, use_container_width=True, hide_index=True)
     
     # Analysis explanation
@@ -616,10 +669,13 @@ def render_abuse_detection_tab(df: pd.DataFrame):
 # =============================================================================
 
 if __name__ == "__main__":
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     
     # Create test data with some abuse patterns
     n_records = 1000
+    n_abuse = 50
+    n_normal = n_records - n_abuse
+    now = datetime.now()
     
     # Normal addresses
     addresses = [f"ADDR_{i:04d}" for i in range(100)]
@@ -627,31 +683,27 @@ if __name__ == "__main__":
     # Create abuse addresses (high concession rate)
     abuse_addresses = ["ABUSE_001", "ABUSE_002", "ABUSE_003"]
     
-    data = []
+    drivers = ['DRV01', 'DRV02', 'DRV03', 'DRV04', 'DRV05']
     
-    # Normal deliveries
-    for i in range(n_records - 50):
-        addr = np.random.choice(addresses)
-        data.append({
-            'tracking_id': f'TRK{i:06d}',
-            'address_id': addr,
-            'transporter_id': np.random.choice(['DRV01', 'DRV02', 'DRV03', 'DRV04', 'DRV05']),
-            'delivery_date_time': datetime.now() - timedelta(days=np.random.randint(0, 60)),
-            'concession_type': np.random.choice([None]*95 + ['neighbor', 'safe_location'], 1)[0]
-        })
+    # Normal deliveries - whole columns drawn at once
+    normal = pd.DataFrame({
+        'tracking_id': 'TRK' + pd.Series(np.arange(n_normal)).astype(str).str.zfill(6),
+        'address_id': rng.choice(addresses, n_normal),
+        'transporter_id': rng.choice(drivers, n_normal),
+        'delivery_date_time': now - pd.to_timedelta(rng.integers(0, 60, n_normal), unit='D'),
+        'concession_type': rng.choice(np.array([None]*95 + ['neighbor', 'safe_location'], dtype=object), n_normal)
+    })
     
     # Abuse pattern deliveries
-    for i in range(50):
-        addr = np.random.choice(abuse_addresses)
-        data.append({
-            'tracking_id': f'ABUSE_TRK{i:04d}',
-            'address_id': addr,
-            'transporter_id': np.random.choice(['DRV01', 'DRV02', 'DRV03', 'DRV04', 'DRV05']),
-            'delivery_date_time': datetime.now() - timedelta(days=np.random.randint(0, 30)),
-            'concession_type': np.random.choice(['neighbor', 'safe_location', None], 1, p=[0.4, 0.4, 0.2])[0]
-        })
-    
-    df = pd.DataFrame(data)
+    abuse = pd.DataFrame({
+        'tracking_id': 'ABUSE_TRK' + pd.Series(np.arange(n_abuse)).astype(str).str.zfill(4),
+        'address_id': rng.choice(abuse_addresses, n_abuse),
+        'transporter_id': rng.choice(drivers, n_abuse),
+        'delivery_date_time': now - pd.to_timedelta(rng.integers(0, 30, n_abuse), unit='D'),
+        'concession_type': rng.choice(np.array(['neighbor', 'safe_location', None], dtype=object), n_abuse, p=[0.4, 0.4, 0.2])
+    })
+    
+    df = pd.concat([normal, abuse], ignore_index=True)
     
     # Run analysis
     detector = CustomerAbuseDetector()
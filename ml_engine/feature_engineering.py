@@ -123,10 +123,15 @@ class FeatureEngineer:
         if drivers is None:
             drivers = df[self.column_config.transporter_id].unique()
         
+        # Partition rows by driver in one hash pass (row positions keep their original order)
+        # instead of a full-frame boolean mask per driver
+        driver_rows = df.groupby(self.column_config.transporter_id, sort=False, observed=True).indices
+        no_rows = np.array([], dtype=np.intp)
+        
         # Compute features for each driver
         features_list = []
         for transporter_id in drivers:
-            driver_df = df[df[self.column_config.transporter_id] == transporter_id]
+            driver_df = df.take(driver_rows.get(transporter_id, no_rows))
             features = self._compute_driver_features(driver_df, reference_date)
             features['transporter_id'] = transporter_id
             features_list.append(features)
@@ -164,6 +169,12 @@ class FeatureEngineer:
         if self.column_config.CONCESSION_TYPE in df.columns:
             df['is_concession'] = df[self.column_config.CONCESSION_TYPE].notna() & \
                                   (df[self.column_config.CONCESSION_TYPE] != '')
+            # Position of each row's type in CONCESSION_TYPES (-1 for other values),
+            # as int8 codes the per-driver type breakdown can bincount
+            df['concession_type_code'] = pd.Categorical(
+                df[self.column_config.CONCESSION_TYPE],
+                categories=self.column_config.CONCESSION_TYPES
+            ).codes
         else:
             # No concession type column - assume no concessions (for delivery-only data)
             df['is_concession'] = False
@@ -176,23 +187,29 @@ class FeatureEngineer:
         """Compute all features for a single driver"""
         features = {}
         
+        # The 30-day window is shared by the performance, contact, time and type
+        # features, so slice it once instead of once per feature group
+        window_30d = driver_df[
+            driver_df[self.column_config.DELIVERY_DATE] >= reference_date - timedelta(days=30)
+        ]
+        
         # Historical rate features
         features.update(self._compute_historical_rates(driver_df, reference_date))
         
         # Performance features
-        features.update(self._compute_performance_features(driver_df, reference_date))
+        features.update(self._compute_performance_features(window_30d))
         
         # Contact features
-        features.update(self._compute_contact_features(driver_df, reference_date))
+        features.update(self._compute_contact_features(window_30d))
         
         # Time pattern features
-        features.update(self._compute_time_patterns(driver_df, reference_date))
+        features.update(self._compute_time_patterns(window_30d))
         
         # Trend features
         features.update(self._compute_trend_features(driver_df, reference_date))
         
         # Concession type breakdown
-        features.update(self._compute_concession_types(driver_df, reference_date))
+        features.update(self._compute_concession_types(window_30d))
         
         return features
     
@@ -202,12 +219,15 @@ class FeatureEngineer:
         """Compute concession rates over multiple time windows"""
         features = {}
         
+        # Extract the two columns once; each window is then a mask sum, not a frame slice
+        dates = df[self.column_config.DELIVERY_DATE]
+        is_concession = df['is_concession'].to_numpy()
+        
         for window in self.config.time_windows:
-            start_date = ref_date - timedelta(days=window)
-            window_df = df[df[self.column_config.DELIVERY_DATE] >= start_date]
+            in_window = (dates >= ref_date - timedelta(days=window)).to_numpy()
             
-            total = len(window_df)
-            concessions = window_df['is_concession'].sum()
+            total = int(in_window.sum())
+            concessions = is_concession[in_window].sum()
             
             features[f"concession_rate_{window}d"] = (
                 concessions / total if total > 0 else 0
@@ -217,16 +237,10 @@ class FeatureEngineer:
         
         return features
     
-    def _compute_performance_features(self, 
-                                       df: pd.DataFrame, 
-                                       ref_date: datetime) -> Dict[str, float]:
-        """Compute delivery performance metrics"""
+    def _compute_performance_features(self, window_df: pd.DataFrame) -> Dict[str, float]:
+        """Compute delivery performance metrics from the driver's 30-day window"""
         features = {}
         
-        # Use 30-day window for performance
-        start_date = ref_date - timedelta(days=30)
-        window_df = df[df[self.column_config.DELIVERY_DATE] >= start_date]
-        
         if len(window_df) == 0:
             return {
                 "avg_daily_deliveries": 0,
@@ -243,10 +257,8 @@ class FeatureEngineer:
         
         return features
     
-    def _compute_contact_features(self, 
-                                   df: pd.DataFrame, 
-                                   ref_date: datetime) -> Dict[str, float]:
-        """Compute contact success patterns"""
+    def _compute_contact_features(self, window_df: pd.DataFrame) -> Dict[str, float]:
+        """Compute contact success patterns from the driver's 30-day window"""
         features = {
             "contact_success_rate": 0,
             "no_contact_streak_max": 0,
@@ -254,12 +266,9 @@ class FeatureEngineer:
         }
         
         # Check if contact column exists
-        if self.column_config.CONTACT_MADE not in df.columns:
+        if self.column_config.CONTACT_MADE not in window_df.columns:
             return features
         
-        start_date = ref_date - timedelta(days=30)
-        window_df = df[df[self.column_config.DELIVERY_DATE] >= start_date].copy()
-        
         if len(window_df) == 0:
             return features
         
@@ -267,17 +276,12 @@ class FeatureEngineer:
         contacts = window_df[self.column_config.CONTACT_MADE].fillna(False)
         features["contact_success_rate"] = contacts.mean()
         
-        # Maximum streak of no contact
-        no_contact = (~contacts).astype(int)
-        streak = 0
-        max_streak = 0
-        for val in no_contact:
-            if val == 1:
-                streak += 1
-                max_streak = max(max_streak, streak)
-            else:
-                streak = 0
-        features["no_contact_streak_max"] = max_streak
+        # Maximum streak of no contact: run boundaries of the no-contact mask
+        # (padded with False) instead of a Python loop over every delivery
+        no_contact = (~contacts).astype(int).to_numpy() == 1
+        edges = np.diff(np.concatenate(([0], no_contact.view(np.int8), [0])))
+        run_lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        features["no_contact_streak_max"] = int(run_lengths.max()) if len(run_lengths) else 0
         
         # Contact improvement trend (compare first half to second half)
         if len(contacts) >= 10:
@@ -288,10 +292,8 @@ class FeatureEngineer:
         
         return features
     
-    def _compute_time_patterns(self, 
-                                df: pd.DataFrame, 
-                                ref_date: datetime) -> Dict[str, float]:
-        """Compute time-based concession patterns"""
+    def _compute_time_patterns(self, window_df: pd.DataFrame) -> Dict[str, float]:
+        """Compute time-based concession patterns from the driver's 30-day window"""
         features = {
             "morning_peak_ratio": 0,
             "evening_peak_ratio": 0,
@@ -300,42 +302,42 @@ class FeatureEngineer:
             "hour_with_most_concessions": 12,
         }
         
-        start_date = ref_date - timedelta(days=30)
-        window_df = df[df[self.column_config.DELIVERY_DATE] >= start_date]
         concessions = window_df[window_df['is_concession']]
         
         if len(concessions) == 0:
             return features
         
+        # One histogram pass per column; the ratios and modes are read off the
+        # 24 hour / 7 weekday bins instead of re-filtering the rows
+        hours = concessions['hour'].dropna().to_numpy()
+        weekdays = concessions['dayofweek'].dropna().to_numpy()
+        hour_counts = np.bincount(hours.astype(np.int64), minlength=24)
+        weekday_counts = np.bincount(weekdays.astype(np.int64), minlength=7)
+        
         # Peak hour ratios
         morning_start, morning_end = self.config.morning_peak
         evening_start, evening_end = self.config.evening_peak
         
-        morning_concessions = concessions[
-            (concessions['hour'] >= morning_start) & 
-            (concessions['hour'] < morning_end)
-        ]
-        evening_concessions = concessions[
-            (concessions['hour'] >= evening_start) & 
-            (concessions['hour'] < evening_end)
-        ]
-        
-        features["morning_peak_ratio"] = len(morning_concessions) / len(concessions)
-        features["evening_peak_ratio"] = len(evening_concessions) / len(concessions)
+        features["morning_peak_ratio"] = hour_counts[morning_start:morning_end].sum() / len(concessions)
+        features["evening_peak_ratio"] = hour_counts[evening_start:evening_end].sum() / len(concessions)
         
         # Weekend ratio
-        weekend_concessions = concessions[concessions['is_weekend']]
-        features["weekend_ratio"] = len(weekend_concessions) / len(concessions)
+        features["weekend_ratio"] = weekday_counts[5:7].sum() / len(concessions)
         
         # Most common weekday/hour for concessions
-        weekday_counts = concessions['dayofweek'].value_counts()
-        hour_counts = concessions['hour'].value_counts()
-        
-        features["weekday_with_most_concessions"] = weekday_counts.idxmax() if len(weekday_counts) > 0 else 0
-        features["hour_with_most_concessions"] = hour_counts.idxmax() if len(hour_counts) > 0 else 12
+        features["weekday_with_most_concessions"] = self._first_mode(weekdays, weekday_counts, 0)
+        features["hour_with_most_concessions"] = self._first_mode(hours, hour_counts, 12)
         
         return features
     
+    @staticmethod
+    def _first_mode(values: np.ndarray, counts: np.ndarray, default):
+        """Most frequent value; ties go to the value seen first, as with value_counts().idxmax()"""
+        if len(values) == 0:
+            return default
+        is_mode = counts == counts.max()
+        return values[is_mode[values.astype(np.int64)].argmax()]
+    
     def _compute_trend_features(self, 
                                  df: pd.DataFrame, 
                                  ref_date: datetime) -> Dict[str, float]:
@@ -388,10 +390,8 @@ class FeatureEngineer:
         
         return features
     
-    def _compute_concession_types(self, 
-                                   df: pd.DataFrame, 
-                                   ref_date: datetime) -> Dict[str, float]:
-        """Compute percentage breakdown by concession type"""
+    def _compute_concession_types(self, window_df: pd.DataFrame) -> Dict[str, float]:
+        """Compute percentage breakdown by concession type from the driver's 30-day window"""
         features = {}
         
         # Initialize all types to 0
@@ -399,23 +399,21 @@ class FeatureEngineer:
             features[f"pct_{ctype}"] = 0
         
         # Check if concession_type column exists
-        if self.column_config.CONCESSION_TYPE not in df.columns:
+        if self.column_config.CONCESSION_TYPE not in window_df.columns:
             return features
         
-        start_date = ref_date - timedelta(days=30)
-        window_df = df[df[self.column_config.DELIVERY_DATE] >= start_date]
-        concessions = window_df[window_df['is_concession']]
+        total = int(window_df['is_concession'].sum())
         
-        if len(concessions) == 0:
+        if total == 0:
             return features
         
-        # Calculate percentages
-        type_counts = concessions[self.column_config.CONCESSION_TYPE].value_counts()
-        total = len(concessions)
+        # Calculate percentages from one count over the precomputed type codes
+        codes = window_df['concession_type_code'].to_numpy()
+        type_counts = np.bincount(codes[codes >= 0], minlength=len(self.column_config.CONCESSION_TYPES))
         
-        for ctype in self.column_config.CONCESSION_TYPES:
-            if ctype in type_counts.index:
-                features[f"pct_{ctype}"] = type_counts[ctype] / total
+        for ctype, count in zip(self.column_config.CONCESSION_TYPES, type_counts):
+            if count > 0:
+                features[f"pct_{ctype}"] = count / total
         
         return features
     
@@ -81,11 +81,12 @@ class PatternAnalyzer:
         - Weekend vs weekday differences
         """
         patterns = []
-        df = self._prepare_data(df)
-        
+        # Narrow to the driver first so a drill-down only copies/parses their rows
         if transporter_id:
             df = df[df['transporter_id'] == transporter_id]
         
+        df = self._prepare_data(df)
+        
         if len(df) < 10:
             return patterns
         
@@ -161,11 +162,34 @@ class PatternAnalyzer:
         """
         Analyze trends in concession rates over time.
         """
-        df = self._prepare_data(df)
-        
         if transporter_id:
             df = df[df['transporter_id'] == transporter_id]
         
+        df = self._prepare_data(df)
+        
+        return self._trend_from_prepared(df)
+    
+    def analyze_trends_by_transporter(self, 
+                                      df: pd.DataFrame,
+                                      window_days: int = 30) -> Dict[str, TrendAnalysis]:
+        """
+        Analyze trends for every transporter from a single prepared frame.
+        
+        Equivalent to calling analyze_trends once per transporter, without
+        re-copying and re-parsing the full dataset for each one.
+        """
+        df = self._prepare_data(df)
+        
+        if 'transporter_id' not in df.columns:
+            return {}
+        
+        return {
+            transporter_id: self._trend_from_prepared(group)
+            for transporter_id, group in df.groupby('transporter_id', sort=False, observed=True)
+        }
+    
+    def _trend_from_prepared(self, df: pd.DataFrame) -> TrendAnalysis:
+        """Fit the daily concession-rate trend of already prepared data"""
         if len(df) < 10 or 'date' not in df.columns:
             return TrendAnalysis(
                 direction="unknown",
@@ -260,40 +284,40 @@ class PatternAnalyzer:
         # Threshold for anomaly
         threshold = anomaly_scores.quantile(1 - contamination)
         
-        for transporter_id in features_df.index:
-            score = anomaly_scores.loc[transporter_id]
-            is_anomaly = score > threshold
-            
-            if is_anomaly:
-                # Find which features are most anomalous
-                transporter_z = z_scores.loc[transporter_id]
-                top_anomalies = transporter_z.nlargest(3)
-                
-                # Get concession rate if available
-                rate = features_df.loc[transporter_id].get('concession_rate_30d', 0)
-                mean_rate = features_df['concession_rate_30d'].mean() if 'concession_rate_30d' in features_df.columns else 0
-                std_rate = features_df['concession_rate_30d'].std() if 'concession_rate_30d' in features_df.columns else 0.01
-                
-                anomaly_type = "spike" if rate > mean_rate else "drop"
-                
-                results.append(AnomalyResult(
-                    transporter_id=str(transporter_id),
-                    anomaly_score=float(score),
-                    is_anomaly=True,
-                    anomaly_type=anomaly_type,
-                    details={
-                        "top_anomalous_features": top_anomalies.to_dict(),
-                        "threshold": float(threshold)
-                    },
-                    anomaly_date=datetime.now(),  # Use current date as proxy
-                    expected_range=(max(0, mean_rate - 2*std_rate), mean_rate + 2*std_rate),
-                    actual_value=float(rate),
-                    deviation_score=float(score),
-                    description=f"Fahrer {transporter_id} zeigt ungewöhnliches Verhalten (Score: {score:.2f})"
-                ))
+        # Select the drivers above the threshold in one vectorized step, highest
+        # deviation first (stable, so ties keep feature-matrix order)
+        candidates = anomaly_scores[anomaly_scores > threshold].sort_values(ascending=False, kind='stable')
+        
+        # Population stats are the same for every driver - compute them once
+        has_rate = 'concession_rate_30d' in features_df.columns
+        mean_rate = features_df['concession_rate_30d'].mean() if has_rate else 0
+        std_rate = features_df['concession_rate_30d'].std() if has_rate else 0.01
         
-        # Sort by deviation score
-        results.sort(key=lambda x: x.deviation_score, reverse=True)
+        for transporter_id, score in candidates.items():
+            # Find which features are most anomalous
+            transporter_z = z_scores.loc[transporter_id]
+            top_anomalies = transporter_z.nlargest(3)
+            
+            # Get concession rate if available
+            rate = features_df.at[transporter_id, 'concession_rate_30d'] if has_rate else 0
+            
+            anomaly_type = "spike" if rate > mean_rate else "drop"
+            
+            results.append(AnomalyResult(
+                transporter_id=str(transporter_id),
+                anomaly_score=float(score),
+                is_anomaly=True,
+                anomaly_type=anomaly_type,
+                details={
+                    "top_anomalous_features": top_anomalies.to_dict(),
+                    "threshold": float(threshold)
+                },
+                anomaly_date=datetime.now(),  # Use current date as proxy
+                expected_range=(max(0, mean_rate - 2*std_rate), mean_rate + 2*std_rate),
+                actual_value=float(rate),
+                deviation_score=float(score),
+                description=f"Fahrer {transporter_id} zeigt ungewöhnliches Verhalten (Score: {score:.2f})"
+            ))
         
         return results
     
@@ -338,24 +362,29 @@ class PatternAnalyzer:
         
         cluster_names = ["High Performers", "Consistent", "Mixed", "At Risk", "Priority"]
         
-        for cluster_id in sorted(labels.unique()):
-            cluster_mask = labels == cluster_id
-            cluster_transporters = features_df.index[cluster_mask].tolist()
+        # Members and average rate of every cluster from one grouping pass,
+        # instead of a boolean mask and .loc re-selection per cluster
+        members = features_df.index.groupby(labels.to_numpy())
+        avg_rates = (
+            features_df['concession_rate_30d'].groupby(labels).mean()
+            if 'concession_rate_30d' in features_df.columns else None
+        )
+        
+        for cluster_id in sorted(members):
+            cluster_transporters = members[cluster_id].tolist()
             
             cluster_name = cluster_names[int(cluster_id) % len(cluster_names)]
             
             clusters[cluster_name] = cluster_transporters
             
-            if len(cluster_transporters) > 0:
-                cluster_features = features_df.loc[cluster_transporters]
-                profile = {
-                    "cluster_id": int(cluster_id),
-                    "name": cluster_name,
-                    "size": len(cluster_transporters),
-                    "avg_rate": cluster_features['concession_rate_30d'].mean() if 'concession_rate_30d' in cluster_features.columns else 0,
-                    "transporters": cluster_transporters[:5]  # Top 5
-                }
-                profiles.append(profile)
+            profile = {
+                "cluster_id": int(cluster_id),
+                "name": cluster_name,
+                "size": len(cluster_transporters),
+                "avg_rate": avg_rates[cluster_id] if avg_rates is not None else 0,
+                "transporters": cluster_transporters[:5]  # Top 5
+            }
+            profiles.append(profile)
         
         return {
             "n_clusters": len(profiles),
@@ -378,11 +407,11 @@ class PatternAnalyzer:
         Detect significant changes in behavior over time.
         """
         change_points = []
-        df = self._prepare_data(df)
-        
         if transporter_id:
             df = df[df['transporter_id'] == transporter_id]
         
+        df = self._prepare_data(df)
+        
         if len(df) < 30 or 'date' not in df.columns:
             return change_points
         
@@ -399,24 +428,29 @@ class PatternAnalyzer:
         
         # Rolling window comparison
         window = 7
-        daily['rolling_mean'] = daily['rate'].rolling(window=window, min_periods=3).mean()
-        daily['rolling_std'] = daily['rate'].rolling(window=window, min_periods=3).std()
-        
-        # Detect significant changes
-        for i in range(window, len(daily) - window):
-            before_mean = daily['rolling_mean'].iloc[i-1]
-            after_mean = daily['rate'].iloc[i:i+window].mean()
-            
-            if before_mean > 0 and abs(after_mean - before_mean) / before_mean > 0.3:
-                change_points.append({
-                    "date": str(daily['date'].iloc[i]),
-                    "before_rate": float(before_mean),
-                    "after_rate": float(after_mean),
-                    "change_pct": float((after_mean - before_mean) / before_mean * 100),
-                    "direction": "increase" if after_mean > before_mean else "decrease"
-                })
-        
-        return change_points[:5]  # Return top 5 change points
+        rate = daily['rate'].to_numpy()
+        rolling_mean = daily['rate'].rolling(window=window, min_periods=3).mean().to_numpy()
+        
+        # Compare every day i in [window, n - window) at once: the trailing mean
+        # ending the day before against the mean of the window starting at i
+        n = len(daily)
+        before = rolling_mean[window - 1:n - window - 1]
+        after = np.lib.stride_tricks.sliding_window_view(rate, window).mean(axis=1)[window:n - window]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            significant = (before > 0) & (np.abs(after - before) / before > 0.3)
+        
+        # Only the first 5 change points are reported - build just those
+        for k in np.flatnonzero(significant)[:5]:
+            before_mean, after_mean = before[k], after[k]
+            change_points.append({
+                "date": str(daily['date'].iloc[k + window]),
+                "before_rate": float(before_mean),
+                "after_rate": float(after_mean),
+                "change_pct": float((after_mean - before_mean) / before_mean * 100),
+                "direction": "increase" if after_mean > before_mean else "decrease"
+            })
+        
+        return change_points  # Top 5 change points
     
     def analyze_correlations(self, features_df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -8,6 +8,7 @@ import numpy as np
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
+import heapq
 import joblib
 import os
 
@@ -178,19 +179,17 @@ class DriverRiskModel:
         if SHAP_AVAILABLE and self._explainer is not None:
             shap_values = self._explainer.shap_values(X_scaled)
         
+        # Categorize all scores at once: searchsorted maps score -> 0 (low), 1 (medium), 2 (high)
+        thresholds = [self.config.risk_threshold_medium, self.config.risk_threshold_high]
+        category_idx = np.searchsorted(thresholds, probabilities * 100, side='right')
+        risk_categories = np.array(["low", "medium", "high"])[category_idx].tolist()
+        
         # Build results
         results = []
         for i, (transporter_id, prob) in enumerate(zip(X.index, probabilities)):
             # Convert probability to 0-100 score
             risk_score = prob * 100
-            
-            # Categorize risk
-            if risk_score >= self.config.risk_threshold_high:
-                risk_category = "high"
-            elif risk_score >= self.config.risk_threshold_medium:
-                risk_category = "medium"
-            else:
-                risk_category = "low"
+            risk_category = risk_categories[i]
             
             # Get top contributing factors
             top_factors = []
@@ -332,8 +331,7 @@ class DriverRiskModel:
                                predictions: List[PredictionResult],
                                top_n: int = 10) -> List[PredictionResult]:
         """Get top N high-risk drivers sorted by risk score"""
-        sorted_predictions = sorted(predictions, key=lambda x: x.risk_score, reverse=True)
-        return sorted_predictions[:top_n]
+        return heapq.nlargest(top_n, predictions, key=lambda x: x.risk_score)
     
     def generate_risk_summary(self, predictions: List[PredictionResult]) -> Dict[str, Any]:
         """
@@ -11,7 +11,13 @@ import sys
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from data_manager import DataManager
+from data_manager import (
+    DataManager,
+    dataframe_fingerprint,
+    read_uploaded_file,
+    render_depot_comparison,
+    summarize_depot_comparison,
+)
 
 
 class TestDataManager:
@@ -86,6 +92,79 @@ class TestDataManager:
         assert summary['name'] == 'Vienna Depot 2'
         assert summary['total_records'] == 100
         assert 'concession_rate' in summary
+    
+    def test_depot_summary_streams_in_batches(self, temp_data_dir, sample_weekly_data):
+        """Test streamed summary stats match a full load, independent of batch size."""
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("DVI2")
+        dm.upload_data("DVI2", sample_weekly_data)
+        
+        df = dm.get_depot_data("DVI2")
+        data_file = Path(temp_data_dir) / "depots" / "DVI2" / "deliveries.parquet"
+        stats = dm._stream_depot_stats(data_file, batch_size=7)
+        
+        assert stats['transporter_count'] == df['transporter_id'].nunique()
+        assert stats['concession_rate'] == pytest.approx(
+            df['concession_type'].notna().sum() / len(df) * 100
+        )
+    
+    def test_get_all_data_skips_bookkeeping(self, temp_data_dir, sample_training_data):
+        """Test combined data omits upload bookkeeping and keeps depot IDs compact."""
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("DVI2")
+        dm.add_depot("MUC1")
+        dm.upload_data("DVI2", sample_training_data)
+        dm.upload_data("MUC1", sample_training_data)
+        
+        df = dm.get_all_data()
+        
+        assert len(df) == 200
+        assert not set(df.columns) & {'_row_hash', '_upload_date', '_upload_label'}
+        assert isinstance(df['_depot_id'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['transporter_id'].dtype, pd.CategoricalDtype)
+        assert set(df['_depot_id']) == {"DVI2", "MUC1"}
+        # Dedup still sees the stored hashes
+        assert '_row_hash' in dm.get_depot_data("DVI2").columns
+    
+    def test_get_all_data_narrows_dtypes(self, temp_data_dir, sample_weekly_data):
+        """Test zip codes load as categoricals and costs as float32 without changing values."""
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("DVI2")
+        dm.upload_data("DVI2", sample_weekly_data)
+        
+        df = dm.get_all_data()
+        stored = dm.get_depot_data("DVI2")
+        
+        assert isinstance(df['zip_code'].dtype, pd.CategoricalDtype)
+        assert df['zip_code'].astype(str).tolist() == stored['zip_code'].astype(str).tolist()
+        assert df['concession_cost'].dtype == np.float32
+        assert df['concession_cost'].to_numpy() == pytest.approx(stored['concession_cost'].to_numpy(), rel=1e-6)
+    
+    def test_data_version_changes_on_upload(self, temp_data_dir, sample_training_data):
+        """Test the data version used as a cache key tracks uploads and deletes."""
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("DVI2")
+        
+        empty = dm.get_data_version(["DVI2"])
+        dm.upload_data("DVI2", sample_training_data)
+        uploaded = dm.get_data_version(["DVI2"])
+        dm.delete_depot_data("DVI2", confirm=True)
+        
+        assert empty == (None,)
+        assert uploaded != empty
+        assert dm.get_data_version(["DVI2"]) == empty
+    
+    def test_row_hashes_match_rowwise_hash(self, temp_data_dir, sample_training_data):
+        """Test vectorized row hashes stay compatible with previously stored hashes."""
+        dm = DataManager(data_dir=temp_data_dir)
+        df = sample_training_data.copy()
+        df['_depot_id'] = 'DVI2'
+        df.loc[3, 'tracking_id'] = None
+        df.loc[4, ['transporter_id', 'delivery_date_time', 'tracking_id']] = None
+        
+        expected = df.apply(dm._create_row_hash, axis=1)
+        
+        assert dm._create_row_hashes(df).tolist() == expected.tolist()
 
 
 class TestWidFormatNormalization:
@@ -130,3 +209,141 @@ class TestWidFormatNormalization:
         
         assert 'address_id' in result.columns
         assert result.loc[0, 'address_id'] == '1010_P0001'
+    
+    def test_pattern_flags_from_mixed_values(self, temp_data_dir):
+        """Test pattern flag columns accept the same truthy values for any dtype."""
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("TEST")
+        
+        df = pd.DataFrame({
+            'transporter_id': ['DRV01'] * 6,
+            'tracking_id': [f'T{i}' for i in range(6)],
+            'delivery_date_time': pd.date_range('2024-12-01', periods=6, freq='1h'),
+            'Geo Distance > 25m': ['Yes', 'no', 'yes', '1', None, 'TRUE'],
+            'High Value Item': [1.0, 0.0, np.nan, 1.0, 0.0, 0.0],
+            'Signature on Delivery': [True, False, True, False, False, True],
+        })
+        
+        dm.upload_data("TEST", df)
+        result = dm.get_depot_data("TEST")
+        
+        assert result['geo_anomaly'].tolist() == [True, False, True, True, False, True]
+        assert result['high_value'].tolist() == [True, False, False, True, False, False]
+        assert result['has_signature'].tolist() == [True, False, True, False, False, True]
+    
+    def test_contact_made_yes_no_values(self, temp_data_dir):
+        """Test Y/N style contact answers are stored as booleans."""
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("TEST")
+        
+        df = pd.DataFrame({
+            'transporter_id': ['DRV01'] * 6,
+            'tracking_id': [f'T{i}' for i in range(6)],
+            'delivery_date_time': pd.date_range('2024-12-01', periods=6, freq='1h'),
+            'Kontakt': ['Y', 'n', ' yes ', 'Ja', None, 1],
+        })
+        
+        dm.upload_data("TEST", df)
+        result = dm.get_depot_data("TEST")
+        
+        assert result['contact_made'].tolist() == [True, False, True, True, False, True]
+
+
+class TestReadUploadedFile:
+    """Tests for parsing uploaded files."""
+    
+    def test_csv_encoding_detected_from_prefix(self):
+        """Test non-UTF-8 CSVs are decoded without a failed UTF-8 parse."""
+        df = pd.DataFrame({'transporter_id': ['DRV01', 'DRV02'], 'city': ['Wien', 'München']})
+        data = df.to_csv(index=False).encode('cp1252')
+        
+        result = read_uploaded_file(data, 'upload.csv')
+        
+        assert result['city'].tolist() == ['Wien', 'München']
+    
+    def test_csv_utf8_with_split_character_in_prefix(self):
+        """Test a multi-byte character cut by the sniff window still reads as UTF-8."""
+        from data_manager import CSV_SNIFF_BYTES
+        
+        header = b'transporter_id,city\n'
+        padding = b'x' * (CSV_SNIFF_BYTES - len(header) - 1)
+        data = header + padding + 'ü,München\n'.encode('utf-8')
+        
+        result = read_uploaded_file(data, 'upload.csv')
+        
+        assert result['city'].iloc[-1] == 'München'
+    
+    def test_csv_delimiter_sniffed(self):
+        """Test semicolon-separated exports split into columns."""
+        data = 'transporter_id;city;cost\nDRV01;Wien;1,5\nDRV02;Graz;2\n'.encode('utf-8')
+        
+        result = read_uploaded_file(data, 'upload.CSV')
+        
+        assert result.columns.tolist() == ['transporter_id', 'city', 'cost']
+        assert result['city'].tolist() == ['Wien', 'Graz']
+    
+    def test_csv_single_column_defaults_to_comma(self):
+        """Test files the sniffer can't classify still read with ','."""
+        result = read_uploaded_file(b'transporter_id\nDRV01\nDRV02\n', 'upload.csv')
+        
+        assert result['transporter_id'].tolist() == ['DRV01', 'DRV02']
+
+
+class TestDataframeFingerprint:
+    """Tests for the cache-key fingerprint."""
+    
+    def test_fingerprint_tracks_content(self, sample_training_data):
+        """Test equal frames share a fingerprint and any cell change alters it."""
+        df = sample_training_data
+        changed = df.copy()
+        changed.loc[5, 'driver_id'] = 'DRV99'
+        
+        assert dataframe_fingerprint(df) == dataframe_fingerprint(df.copy())
+        assert dataframe_fingerprint(df) != dataframe_fingerprint(changed)
+        assert dataframe_fingerprint(df) != dataframe_fingerprint(df.iloc[:-1])
+    
+    def test_fingerprint_unhashable_values(self):
+        """Test columns holding unhashable objects still fingerprint."""
+        df = pd.DataFrame({'patterns': [['a'], ['b', 'c']]})
+        
+        assert dataframe_fingerprint(df) != dataframe_fingerprint(pd.DataFrame({'patterns': [['a'], ['b']]}))
+
+
+class TestDepotComparison:
+    """Tests for the depot comparison view."""
+    
+    @pytest.fixture
+    def two_depot_manager(self, temp_data_dir, sample_weekly_data):
+        dm = DataManager(data_dir=temp_data_dir)
+        dm.add_depot("DVI2")
+        dm.add_depot("MUC1")
+        dm.upload_data("DVI2", sample_weekly_data)
+        dm.upload_data("MUC1", sample_weekly_data.iloc[:40])
+        return dm
+    
+    def test_summarize_depot_comparison(self, two_depot_manager):
+        """Test per-depot and weekly counts, with and without concession_type, leave the data untouched."""
+        all_data = two_depot_manager.get_all_data()
+        columns = all_data.columns.tolist()
+        
+        depot_stats, weekly = summarize_depot_comparison(all_data)
+        
+        assert all_data.columns.tolist() == columns
+        stats = depot_stats.set_index('Depot')
+        for depot_id, group in all_data.groupby('_depot_id', observed=True):
+            assert stats.at[depot_id, 'Total Deliveries'] == len(group)
+            assert stats.at[depot_id, 'Concessions'] == group['concession_type'].notna().sum()
+            assert stats.at[depot_id, 'Drivers'] == group['transporter_id'].nunique()
+        assert weekly['Deliveries'].sum() == len(all_data)
+        assert weekly['Concessions'].sum() == all_data['concession_type'].notna().sum()
+        
+        depot_stats, weekly = summarize_depot_comparison(all_data.drop(columns='concession_type'))
+        
+        assert (depot_stats['Concessions'] == 0).all()
+        assert (weekly['Rate'] == 0).all()
+    
+    def test_render_depot_comparison(self, two_depot_manager):
+        """Test the view renders for two depots (Streamlit bare mode)."""
+        pytest.importorskip("streamlit")
+        
+        render_depot_comparison(two_depot_manager, pd.DataFrame())